@@ -1 +1 @@
-from .config import DbSettings, DjangoSettings, EmailSettings, generate_secret_key
\ No newline at end of file
+from .config import DbSettings, DjangoSettings, EmailSettings, CacheSettings, GunicornSettings, generate_secret_key
\ No newline at end of file
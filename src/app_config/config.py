@@ -1,3 +1,4 @@
+import os
 from os import environ
 import secrets
 
@@ -26,6 +27,22 @@ class DbSettings:
         database user
     password: str
         database password
+    conn_max_age: int
+        seconds to keep a connection open between requests, 0 closes it after each request (default is 60)
+    conn_health_checks: bool
+        check a persistent connection still works before reusing it (default is True)
+    pool: bool
+        use a psycopg connection pool in each process instead of persistent connections (default is False)
+    pool_min_size: int
+        connections the pool keeps open (default is 2)
+    pool_max_size: int
+        most connections the pool opens (default is 10)
+    pool_timeout: int
+        seconds to wait for a free connection from the pool (default is 30)
+    replica_hosts: list
+        read replica hosts, each optionally with a port as host:port (default is none)
+    replica_read_your_writes: int
+        seconds a client reads from the primary after making a change (default is 5)
     """
 
     def __init__(self):
@@ -35,9 +52,66 @@ class DbSettings:
             self.port = environ.get('POSTGRES_PORT', "5432")
             self.user = environ.get('POSTGRES_USER')
             self.password = environ.get('POSTGRES_PASSWORD')
+            self.conn_max_age = int(environ.get('POSTGRES_CONN_MAX_AGE', '60'))
+            self.conn_health_checks = (environ.get('POSTGRES_CONN_HEALTH_CHECKS', 'true').lower() == 'true')
+            self.pool = (environ.get('POSTGRES_POOL', 'false').lower() == 'true')
+            self.pool_min_size = int(environ.get('POSTGRES_POOL_MIN_SIZE', '2'))
+            self.pool_max_size = int(environ.get('POSTGRES_POOL_MAX_SIZE', '10'))
+            self.pool_timeout = int(environ.get('POSTGRES_POOL_TIMEOUT', '30'))
+            self.replica_hosts = [host.strip() for host in environ.get('POSTGRES_REPLICA_HOSTS', '').split(',')
+                                  if host.strip()]
+            self.replica_read_your_writes = int(environ.get('POSTGRES_REPLICA_READ_YOUR_WRITES', '5'))
+            if self.pool_min_size > self.pool_max_size:
+                raise ValueError('POSTGRES_POOL_MIN_SIZE must not be more than POSTGRES_POOL_MAX_SIZE')
         except KeyError as e:
             print(f'An error occurred: {e} not set')
             raise SystemExit(1)
+        except ValueError as e:
+            print(f'An error occurred: {e}')
+            raise SystemExit(1)
+
+    def get_database_config(self):
+        """
+        Get the Django DATABASES entry for these settings.
+        The pool already reuses connections so persistent connections are turned off when it is enabled.
+        return: database configuration dictionary
+        """
+        config = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'HOST': self.host,
+            'PASSWORD': self.password,
+            'USER': self.user,
+            'PORT': self.port,
+            'NAME': self.name,
+            'CONN_MAX_AGE': 0 if self.pool else self.conn_max_age,
+            'CONN_HEALTH_CHECKS': self.conn_health_checks,
+        }
+        if self.pool:
+            config['OPTIONS'] = {
+                'pool': {
+                    'min_size': self.pool_min_size,
+                    'max_size': self.pool_max_size,
+                    'timeout': self.pool_timeout,
+                },
+            }
+        return config
+
+    def get_replica_configs(self):
+        """
+        Get the Django DATABASES entries for the read replicas, named replica1, replica2 and so on.
+        Replicas use the same database, credentials and connection settings as the primary.
+        return: dictionary of database alias to database configuration
+        """
+        replicas = {}
+        for number, replica in enumerate(self.replica_hosts, start=1):
+            host, _, port = replica.partition(':')
+            config = self.get_database_config()
+            config['HOST'] = host
+            config['PORT'] = port or self.port
+            # Tests run against the primary's test database instead of creating one per replica
+            config['TEST'] = {'MIRROR': 'default'}
+            replicas[f'replica{number}'] = config
+        return replicas
 
 
 class DjangoSettings:
@@ -56,7 +130,19 @@ class DjangoSettings:
         Full url of site including protocol, eg https://example.com
     allowed_hosts: str
         list of approved hostnames for the website
+    session_engine: str
+        session storage, one of db, cached_db, cache or signed_cookies (default is db)
+    server_mode: str
+        how the web server runs the application, wsgi or asgi (default is wsgi)
     """
+    session_engines = {
+        'db': 'django.contrib.sessions.backends.db',
+        'cached_db': 'django.contrib.sessions.backends.cached_db',
+        'cache': 'django.contrib.sessions.backends.cache',
+        'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    }
+
+    server_modes = ('wsgi', 'asgi')
 
     def __init__(self):
         try:
@@ -65,8 +151,14 @@ class DjangoSettings:
             self.debug = (environ.get('DEBUG', 'false').lower() == 'true')
             self.site_url = environ.get('SITE_URL')
             self.allowed_hosts = environ.get('ALLOWED_HOST', '').split(',')
-        except KeyError as e:
-            print(f'An error occurred: {e} not set')
+            self.session_engine = environ.get('SESSION_ENGINE', 'db').lower()
+            if self.session_engine not in self.session_engines:
+                raise ValueError(f'SESSION_ENGINE must be one of {", ".join(self.session_engines)}')
+            self.server_mode = environ.get('SERVER_MODE', 'wsgi').lower()
+            if self.server_mode not in self.server_modes:
+                raise ValueError(f'SERVER_MODE must be one of {", ".join(self.server_modes)}')
+        except (KeyError, ValueError) as e:
+            print(f'An error occurred: {e}')
             raise SystemExit(1)
 
 
@@ -88,16 +180,124 @@ class EmailSettings:
         SMTP password
     default_from_email: str
         Default sender email
+    backend: str
+        email delivery, one of smtp, console or file (default is smtp)
+    file_path: str
+        directory emails are written to by the file backend
     """
+    backends = {
+        'smtp': 'django.core.mail.backends.smtp.EmailBackend',
+        'console': 'django.core.mail.backends.console.EmailBackend',
+        'file': 'django.core.mail.backends.filebased.EmailBackend',
+    }
 
     def __init__(self):
         try:
+            self.backend = environ.get('EMAIL_BACKEND', 'smtp').lower()
+            self.file_path = environ.get('EMAIL_FILE_PATH', '/tmp/kbase-email')
+            if self.backend not in self.backends:
+                raise ValueError(f'EMAIL_BACKEND must be one of {", ".join(self.backends)}')
             self.host = environ.get('EMAIL_HOST')
             self.port = environ.get('EMAIL_PORT', "587")
             self.use_tls = (environ.get('EMAIL_USE_TLS', 'true').lower() == 'true')
             self.user = environ.get('EMAIL_HOST_USER')
             self.password = environ.get('EMAIL_HOST_PASSWORD')
             self.default_from_email = environ.get('DEFAULT_FROM_EMAIL')
-        except KeyError as e:
-            print(f'An error occurred: {e} not set')
+        except (KeyError, ValueError) as e:
+            print(f'An error occurred: {e}')
+            raise SystemExit(1)
+
+
+class CacheSettings:
+    """
+    Creates a CacheSettings object for this application from environment variables.
+
+    Attributes
+    ----------
+    backend : str
+        cache type, one of locmem, file, redis, memcached or dummy (default is locmem)
+    location: str
+        directory for the file cache or server address for redis and memcached
+    timeout: int
+        default cache timeout in seconds (default is 300)
+    key_prefix: str
+        prefix added to all cache keys (default is kbase)
+    cache_users: bool
+        cache the signed in user between requests (default is False)
+    """
+    backends = {
+        'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+        'file': 'django.core.cache.backends.filebased.FileBasedCache',
+        'redis': 'django.core.cache.backends.redis.RedisCache',
+        'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'dummy': 'django.core.cache.backends.dummy.DummyCache',
+    }
+
+    def __init__(self):
+        try:
+            self.backend = environ.get('CACHE_BACKEND', 'locmem').lower()
+            self.location = environ.get('CACHE_LOCATION', '')
+            self.timeout = int(environ.get('CACHE_TIMEOUT', '300'))
+            self.key_prefix = environ.get('CACHE_KEY_PREFIX', 'kbase')
+            self.cache_users = (environ.get('CACHE_USERS', 'false').lower() == 'true')
+            if self.backend not in self.backends:
+                raise ValueError(f'CACHE_BACKEND must be one of {", ".join(self.backends)}')
+            if self.backend == 'file' and not self.location:
+                self.location = '/tmp/kbase-cache'
+        except (KeyError, ValueError) as e:
+            print(f'An error occurred: {e}')
+            raise SystemExit(1)
+
+    def get_cache_config(self):
+        """
+        Get the Django CACHES entry for these settings.
+        return: cache configuration dictionary
+        """
+        return {
+            'BACKEND': self.backends[self.backend],
+            'LOCATION': self.location,
+            'TIMEOUT': self.timeout,
+            'KEY_PREFIX': self.key_prefix,
+        }
+
+
+class GunicornSettings:
+    """
+    Creates a GunicornSettings object for the web server from environment variables, used by gunicorn.conf.py.
+
+    Attributes
+    ----------
+    workers : int
+        worker processes (default is two per available CPU plus one)
+    threads : int
+        threads per worker, more than one uses gthread workers in wsgi mode (default is 1)
+    preload : bool
+        load the application before forking workers so they share its memory (default is True)
+    keepalive : int
+        seconds to keep an idle client connection open (default is 5)
+    max_requests : int
+        requests a worker serves before it is replaced, 0 never replaces it (default is 1000)
+    max_requests_jitter : int
+        random extra requests added to max_requests so workers are not replaced together (default is 100)
+    timeout : int
+        seconds a worker can be silent before it is killed and replaced (default is 30)
+    graceful_timeout : int
+        seconds a worker has to finish its requests when restarting (default is 30)
+    """
+
+    def __init__(self):
+        try:
+            # process_cpu_count only counts the CPUs this process may run on, not every CPU on the host
+            self.workers = int(environ.get('GUNICORN_WORKERS', (os.process_cpu_count() or 1) * 2 + 1))
+            self.threads = int(environ.get('GUNICORN_THREADS', '1'))
+            self.preload = (environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true')
+            self.keepalive = int(environ.get('GUNICORN_KEEPALIVE', '5'))
+            self.max_requests = int(environ.get('GUNICORN_MAX_REQUESTS', '1000'))
+            self.max_requests_jitter = int(environ.get('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+            self.timeout = int(environ.get('GUNICORN_TIMEOUT', '30'))
+            self.graceful_timeout = int(environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+            if self.workers < 1 or self.threads < 1:
+                raise ValueError('GUNICORN_WORKERS and GUNICORN_THREADS must be at least 1')
+        except ValueError as e:
+            print(f'An error occurred: {e}')
             raise SystemExit(1)
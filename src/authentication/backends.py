@@ -0,0 +1,35 @@
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def get_user_cache_key(user_id):
+    """
+    Get the cache key for a cached user.
+
+    Parameters
+    ----------
+    user_id: int
+        user primary key
+
+    Returns
+    -------
+    cache key string
+    """
+    return f'kbase:user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    Model backend which caches the user loaded by AuthenticationMiddleware, so signed in requests do not
+    fetch the user row every time. The cached user is removed whenever the user is saved or deleted.
+    Only use with a cache shared by every worker, otherwise other workers keep the old user until it expires.
+    """
+
+    def get_user(self, user_id):
+        key = get_user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user)
+        return user
@@ -0,0 +1,161 @@
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from authentication.models import User, Group, ALL_USERS_GROUP_ID
+from authentication.utils import queue_verification_emails, check_import_groups, add_missing_groups
+from kbase.access import rebuild_article_access
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+
+
+class Command(BaseCommand):
+    help = ('Import users from a CSV or JSONL file. Each row needs email, first_name and last_name and can have '
+            'password, groups (semicolon separated in CSV, a list in JSONL), is_admin and is_verified. '
+            'Rows which are invalid or already exist are reported and skipped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import')
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help='File format (default is taken from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of users to insert per transaction (default is 500)')
+        parser.add_argument('--create-groups', action='store_true',
+                            help='Create groups which do not exist, otherwise rows with unknown groups are skipped')
+        parser.add_argument('--send-verification', action='store_true',
+                            help='Queue verification emails for imported users who are not verified')
+        parser.add_argument('--hash-workers', type=int, default=os.cpu_count() or 1,
+                            help='Threads used to hash passwords (default is the number of CPUs)')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or Path(options['path']).suffix.lstrip('.').lower()
+        if file_format not in ('csv', 'jsonl'):
+            raise CommandError('Could not tell the file format from the extension, use --format csv or jsonl')
+
+        self.batch_size = options['batch_size']
+        self.create_groups = options['create_groups']
+        self.send_verification = options['send_verification']
+        # Hashing releases the GIL so threads hash passwords in parallel
+        self.hash_pool = ThreadPoolExecutor(max_workers=options['hash_workers'])
+        self.groups = {group.name: group.pk for group in Group.objects.exclude(pk=ALL_USERS_GROUP_ID)}
+        self.all_users_name = Group.objects.get(pk=ALL_USERS_GROUP_ID).name
+        self.seen_emails = set()
+        self.imported = self.skipped = 0
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as file:
+                rows = self.read_csv(file) if file_format == 'csv' else self.read_jsonl(file)
+                batch = []
+                for line, row in rows:
+                    batch.append((line, row))
+                    if len(batch) == self.batch_size:
+                        self.import_batch(batch)
+                        batch = []
+                if batch:
+                    self.import_batch(batch)
+        except OSError as e:
+            raise CommandError(e)
+        finally:
+            self.hash_pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {self.imported} users, skipped {self.skipped}.'))
+
+    @staticmethod
+    def read_csv(file):
+        reader = csv.DictReader(file)
+        for row in reader:
+            row['groups'] = [name for name in (row.get('groups') or '').split(';') if name.strip()]
+            yield reader.line_num, row
+
+    @staticmethod
+    def read_jsonl(file):
+        for line, text in enumerate(file, start=1):
+            if text.strip():
+                try:
+                    yield line, json.loads(text)
+                except json.JSONDecodeError as e:
+                    yield line, {'_error': f'invalid JSON, {e}'}
+
+    def skip(self, line, message):
+        self.skipped += 1
+        self.stderr.write(f'Line {line}: {message}')
+
+    def parse_row(self, line, row):
+        """
+        Validate a row and build an unsaved user, returns None if the row is skipped.
+        """
+        if '_error' in row:
+            return self.skip(line, row['_error'])
+
+        email = User.objects.normalize_email((row.get('email') or '').strip())
+        if email.lower() in self.seen_emails:
+            return self.skip(line, f'{email} appears more than once')
+
+        user = User(
+            email=email,
+            first_name=(row.get('first_name') or '').strip(),
+            last_name=(row.get('last_name') or '').strip(),
+            is_admin=str(row.get('is_admin', '')).lower() in TRUE_VALUES,
+            is_verified=str(row.get('is_verified', '')).lower() in TRUE_VALUES,
+        )
+        try:
+            # Uniqueness is checked for the whole batch in one query
+            user.full_clean(exclude=['password'], validate_unique=False)
+        except ValidationError as e:
+            return self.skip(line, '; '.join(f'{field}: {" ".join(errors)}'
+                                             for field, errors in e.message_dict.items()))
+
+        group_names = {str(name).strip().lower() for name in row.get('groups') or []} - {self.all_users_name}
+        error = check_import_groups(group_names, self.groups, self.create_groups)
+        if error:
+            return self.skip(line, error)
+
+        self.seen_emails.add(email.lower())
+        user._import_groups = group_names
+        user._import_password = row.get('password') or None
+        return user
+
+    def import_batch(self, batch):
+        parsed = [(line, self.parse_row(line, row)) for line, row in batch]
+        parsed = [(line, user) for line, user in parsed if user is not None]
+
+        # Skip users who already exist
+        existing = set(User.objects.filter(email__in=[user.email for _, user in parsed])
+                       .values_list('email', flat=True))
+        users = []
+        for line, user in parsed:
+            if user.email in existing:
+                self.skip(line, f'{user.email} already exists')
+            else:
+                users.append(user)
+        if not users:
+            return
+
+        # Users without a password get an unusable one and must be given one before they can sign in
+        passwords = self.hash_pool.map(make_password, [user._import_password for user in users])
+        for user, password in zip(users, passwords):
+            user.password = password
+
+        with transaction.atomic():
+            add_missing_groups(set().union(*(user._import_groups for user in users)), self.groups)
+            users = User.objects.bulk_create(users)
+            Group.users.through.objects.bulk_create(
+                [Group.users.through(group_id=self.groups[name], user_id=user.pk)
+                 for user in users for name in user._import_groups],
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+            # Bulk inserts skip the membership signals
+            user_ids = [user.pk for user in users]
+            rebuild_article_access(users=user_ids)
+
+        if self.send_verification:
+            queue_verification_emails(User.objects.filter(pk__in=user_ids), chunk_size=self.batch_size)
+        self.imported += len(users)
@@ -0,0 +1,55 @@
+from datetime import timedelta
+from time import sleep
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from authentication.utils import send_queued_emails, purge_sent_emails
+
+
+class Command(BaseCommand):
+    help = 'Send emails waiting in the outbox in batches over one mail server connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Number of emails to send per transaction (default is 100)')
+        parser.add_argument('--max-attempts', type=int, default=8,
+                            help='Number of tries before an email is given up on (default is 8)')
+        parser.add_argument('--retry-delay', type=float, default=60,
+                            help='Seconds to wait before retrying a failed email, doubled on each attempt '
+                                 '(default is 60)')
+        parser.add_argument('--keep-days', type=int, default=7,
+                            help='Days to keep sent emails before deleting them (default is 7)')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and check the outbox every interval')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to wait when the outbox is empty or sending fails in loop mode '
+                                 '(default is 5)')
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        try:
+            while True:
+                sent, failed = send_queued_emails(
+                    batch_size=options['batch_size'],
+                    max_attempts=options['max_attempts'],
+                    retry_delay=timedelta(seconds=options['retry_delay']),
+                    connection=connection,
+                )
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent} emails, {failed} failed.')
+                # Keep going while there may be more emails waiting, unless nothing could be sent
+                # in which case the mail server is likely down and the next batch would fail too
+                if sent and sent + failed == options['batch_size']:
+                    continue
+
+                # The outbox is drained or the mail server is failing, close the connection rather than leave it idle
+                connection.close()
+                purge_sent_emails(options['keep_days'])
+                if not options['loop']:
+                    break
+                sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0013_user_last_verification_email_sent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('from_email', models.CharField(blank=True, max_length=254)),
+                ('recipient', models.EmailField(max_length=254)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('sent_date', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sent_date', 'id'], name='auth_outbox_sent_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-18 21:05
+
+from django.db import migrations
+
+ALL_USERS_GROUP_ID = 1
+
+
+def remove_all_users_members(apps, schema_editor):
+    # Every user is implicitly in 'All Users' so the membership rows are no longer needed
+    group = apps.get_model('authentication', 'Group')
+    group.users.through.objects.filter(group_id=ALL_USERS_GROUP_ID).delete()
+
+
+def add_all_users_members(apps, schema_editor):
+    group = apps.get_model('authentication', 'Group')
+    user = apps.get_model('authentication', 'User')
+    group.users.through.objects.bulk_create(
+        (group.users.through(group_id=ALL_USERS_GROUP_ID, user_id=user_id)
+         for user_id in user.objects.values_list('id', flat=True).iterator()),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0014_outboxemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_all_users_members, add_all_users_members),
+    ]
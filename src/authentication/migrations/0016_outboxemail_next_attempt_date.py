@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 21:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0015_remove_all_users_members'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxemail',
+            name='next_attempt_date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
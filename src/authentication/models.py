@@ -1,9 +1,15 @@
 from django.core.exceptions import ValidationError, PermissionDenied
 from django.core.validators import RegexValidator
 from django.db import models, IntegrityError
+from django.utils import timezone
 from django.contrib.auth.models import BaseUserManager, AbstractBaseUser
 
 
+# Primary key of the 'All Users' group created by migration 0011. Every user is implicitly a member so
+# no membership rows are stored for it
+ALL_USERS_GROUP_ID = 1
+
+
 # Create your models here.
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, first_name, last_name, password=None):
@@ -64,13 +70,6 @@ class User(AbstractBaseUser):
     def full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Add the user to 'All Users' group if not already a member
-        group = Group.objects.get(pk=1)
-        if not self.groups.filter(pk=group.pk).exists():
-            self.groups.add(group)
-
     def __str__(self):
         return self.email
 
@@ -88,7 +87,7 @@ class Group(models.Model):
 
     def save(self, *args, **kwargs):
         # Prevent edit of 'All Users' group
-        if self.id == 1:
+        if self.id == ALL_USERS_GROUP_ID:
             raise PermissionDenied("The 'All Users' group cannot be altered")
         self.name = self.name.lower()
         try:
@@ -99,9 +98,33 @@ class Group(models.Model):
 
     def delete(self, *args, **kwargs):
         # Prevent deletion of 'All Users' group
-        if self.id == 1:
+        if self.id == ALL_USERS_GROUP_ID:
             raise PermissionDenied("The 'All Users' group cannot be deleted")
         super().delete(*args, **kwargs)
 
     def __str__(self):
-        return self.name.title()
\ No newline at end of file
+        return self.name.title()
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be sent by the send_queued_email worker, so requests never wait on the mail server.
+    """
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipient = models.EmailField()
+    created_date = models.DateTimeField(auto_now_add=True)
+    sent_date = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Failed emails wait longer before each retry, and claimed emails are held back while they send
+    next_attempt_date = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Pending emails are found by a null sent_date and old sent emails are purged by date
+            models.Index(fields=['sent_date', 'id'], name='auth_outbox_sent_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} to {self.recipient}'
@@ -0,0 +1,15 @@
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .backends import get_user_cache_key
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def clear_cached_user(sender, instance, **kwargs):
+    """
+    Remove a saved or deleted user from the cache so the next request loads it again.
+    """
+    cache.delete(get_user_cache_key(instance.pk))
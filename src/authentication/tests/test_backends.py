@@ -0,0 +1,97 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+from authentication.backends import CachedModelBackend, get_user_cache_key
+from authentication.models import User
+
+# Generate a random user password for test accounts
+TEST_USER_PASSWORD = get_random_string(length=24)
+
+
+@override_settings(AUTHENTICATION_BACKENDS=['authentication.backends.CachedModelBackend',
+                                           'django.contrib.auth.backends.ModelBackend'])
+class CachedModelBackendTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.backend = CachedModelBackend()
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            first_name='Test',
+            last_name='User',
+            password=TEST_USER_PASSWORD
+        )
+        self.user.is_verified = True
+        self.user.save()
+
+    def test_get_user_is_cached(self):
+        # Test the user is only fetched from the database once
+        with self.assertNumQueries(1):
+            self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+        self.assertEqual(user, self.user)
+
+    def test_get_missing_user(self):
+        # Test a missing user returns None and is not cached
+        self.assertIsNone(self.backend.get_user(self.user.pk + 1))
+        self.assertIsNone(cache.get(get_user_cache_key(self.user.pk + 1)))
+
+    def test_save_clears_cached_user(self):
+        # Test saving a user removes the cached copy
+        self.backend.get_user(self.user.pk)
+        self.user.is_admin = True
+        self.user.save()
+        self.assertIsNone(cache.get(get_user_cache_key(self.user.pk)))
+        self.assertTrue(self.backend.get_user(self.user.pk).is_admin)
+
+    def test_delete_clears_cached_user(self):
+        # Test deleting a user removes the cached copy
+        user_id = self.user.pk
+        self.backend.get_user(user_id)
+        self.user.delete()
+        self.assertIsNone(self.backend.get_user(user_id))
+
+    def test_signed_in_request_uses_cached_user(self):
+        # Test signed in requests do not fetch the user once it is cached
+        self.client.login(username=self.user.email, password=TEST_USER_PASSWORD)
+        self.client.get(reverse('dashboard'))
+        with self.assertNumQueries(0):
+            user = CachedModelBackend().get_user(self.user.pk)
+        self.assertEqual(user, self.user)
+
+    def test_password_change_signs_out_cached_user(self):
+        # Test changing the password still invalidates existing sessions
+        self.client.login(username=self.user.email, password=TEST_USER_PASSWORD)
+        self.client.get(reverse('dashboard'))
+        self.user.set_password(get_random_string(length=24))
+        self.user.save()
+        response = self.client.get(reverse('dashboard'))
+        self.assertRedirects(response, f"{reverse('sign-in')}?next={reverse('dashboard')}")
+
+
+    def test_existing_model_backend_session_stays_signed_in(self):
+        # Test sessions created before the cached backend was enabled are still accepted
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'], self.user)
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class CachedSessionTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            first_name='Test',
+            last_name='User',
+            password=TEST_USER_PASSWORD
+        )
+        self.user.is_verified = True
+        self.user.save()
+
+    def test_session_read_from_cache(self):
+        # Test a signed in request does not read the session table
+        self.client.login(username=self.user.email, password=TEST_USER_PASSWORD)
+        with self.assertNumQueries(0):
+            self.client.session.load()
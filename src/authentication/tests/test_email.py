@@ -0,0 +1,159 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+from authentication.models import OutboxEmail, User
+from authentication.utils import (queue_email, send_queued_emails, purge_sent_emails, queue_verification_emails,
+                                  EmailVerificationTokenGenerator)
+
+
+class FailingEmailBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError('Mail server unavailable')
+
+
+class OutboxTestCase(TestCase):
+    def test_queue_email(self):
+        # Test queueing adds one outbox row per recipient without sending anything
+        queue_email('Subject', 'Body', ['one@example.com', 'two@example.com'], from_email='kbase@example.com')
+        self.assertEqual(OutboxEmail.objects.filter(sent_date__isnull=True).count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_send_queued_emails(self):
+        # Test queued emails are sent in batches and marked as sent
+        queue_email('Subject', 'Body', [f'user{i}@example.com' for i in range(3)], from_email='kbase@example.com')
+        self.assertEqual(send_queued_emails(batch_size=2), (2, 0))
+        self.assertEqual(send_queued_emails(batch_size=2), (1, 0))
+        self.assertEqual(send_queued_emails(batch_size=2), (0, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].to, ['user0@example.com'])
+        self.assertFalse(OutboxEmail.objects.filter(sent_date__isnull=True).exists())
+
+    def test_failed_emails_are_retried(self):
+        # Test failed emails stay queued with the error and wait longer before each retry until max attempts
+        queue_email('Subject', 'Body', ['user@example.com'], from_email='kbase@example.com')
+        connection = FailingEmailBackend()
+        self.assertEqual(send_queued_emails(max_attempts=3, connection=connection), (0, 1))
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.last_error, 'Mail server unavailable')
+        self.assertAlmostEqual(email.next_attempt_date, now() + timedelta(minutes=1), delta=timedelta(seconds=10))
+
+        # Not retried before the delay has passed
+        self.assertEqual(send_queued_emails(max_attempts=3, connection=connection), (0, 0))
+
+        OutboxEmail.objects.update(next_attempt_date=now())
+        self.assertEqual(send_queued_emails(max_attempts=3, connection=connection), (0, 1))
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.attempts, 2)
+        self.assertAlmostEqual(email.next_attempt_date, now() + timedelta(minutes=2), delta=timedelta(seconds=10))
+
+        OutboxEmail.objects.update(next_attempt_date=now())
+        self.assertEqual(send_queued_emails(max_attempts=3, connection=connection), (0, 1))
+        OutboxEmail.objects.update(next_attempt_date=now())
+        self.assertEqual(send_queued_emails(max_attempts=3, connection=connection), (0, 0))
+        self.assertIsNone(OutboxEmail.objects.get().sent_date)
+
+    def test_claimed_emails_are_not_sent_twice(self):
+        # Test emails claimed by a worker which stopped before recording the result wait for the claim to expire
+        queue_email('Subject', 'Body', ['user@example.com'], from_email='kbase@example.com')
+        OutboxEmail.objects.update(attempts=1, next_attempt_date=now() + timedelta(minutes=10))
+        self.assertEqual(send_queued_emails(), (0, 0))
+        OutboxEmail.objects.update(next_attempt_date=now())
+        self.assertEqual(send_queued_emails(), (1, 0))
+        self.assertEqual(OutboxEmail.objects.get().attempts, 2)
+
+    def test_purge_sent_emails(self):
+        # Test only emails sent before the cut off are deleted
+        queue_email('Subject', 'Body', ['old@example.com', 'new@example.com', 'queued@example.com'],
+                    from_email='kbase@example.com')
+        OutboxEmail.objects.filter(recipient='old@example.com').update(sent_date=now() - timedelta(days=8))
+        OutboxEmail.objects.filter(recipient='new@example.com').update(sent_date=now())
+        self.assertEqual(purge_sent_emails(days=7), 1)
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+
+    def test_send_queued_email_command(self):
+        # Test the command drains the outbox and exits when not looping
+        queue_email('Subject', 'Body', [f'user{i}@example.com' for i in range(5)], from_email='kbase@example.com')
+        out = StringIO()
+        call_command('send_queued_email', '--batch-size', '2', stdout=out)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertIn('Sent 2 emails, 0 failed.', out.getvalue())
+        self.assertIn('Sent 1 emails, 0 failed.', out.getvalue())
+
+    def test_send_queued_email_command_stops_when_sending_fails(self):
+        # Test a batch which only failed does not start the next batch straight away
+        queue_email('Subject', 'Body', [f'user{i}@example.com' for i in range(4)], from_email='kbase@example.com')
+        out = StringIO()
+        with self.settings(EMAIL_BACKEND='authentication.tests.test_email.FailingEmailBackend'):
+            call_command('send_queued_email', '--batch-size', '2', stdout=out)
+        self.assertEqual(out.getvalue().count('Sent 0 emails, 2 failed.'), 1)
+        self.assertEqual(OutboxEmail.objects.filter(attempts=0).count(), 2)
+
+    def test_sign_up_queues_verification_email(self):
+        # Test sign up only queues the verification email for the worker
+        response = self.client.post(reverse('sign-up'), {
+            'first_name': 'New',
+            'last_name': 'User',
+            'email': 'newuser@example.com',
+            'password1': 'djangopassword123',
+            'password2': 'djangopassword123'
+        })
+        self.assertRedirects(response, reverse('sign-in'))
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.recipient, 'newuser@example.com')
+        self.assertIn('/verify/', email.body)
+
+        send_queued_emails()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Verify Your Email')
+
+
+class QueueVerificationEmailsTestCase(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                email=f'user{i}@example.com',
+                first_name='Test',
+                last_name='User',
+                password='djangopassword123'
+            ) for i in range(5)
+        ]
+        self.users[0].is_verified = True
+        self.users[0].save()
+        self.users[1].last_verification_email_sent = now()
+        self.users[1].save()
+
+    def test_queue_verification_emails(self):
+        # Test only unverified users without a recent email are queued
+        self.assertEqual(queue_verification_emails(chunk_size=2), 3)
+        self.assertEqual(
+            set(OutboxEmail.objects.values_list('recipient', flat=True)),
+            {'user2@example.com', 'user3@example.com', 'user4@example.com'}
+        )
+        for user in self.users[2:]:
+            user.refresh_from_db()
+            self.assertIsNotNone(user.last_verification_email_sent)
+        self.assertEqual(queue_verification_emails(), 0)
+
+    def test_queued_verification_link_is_valid(self):
+        # Test the queued link verifies the user
+        queue_verification_emails()
+        body = OutboxEmail.objects.get(recipient='user2@example.com').body
+        token = body.split('/verify/')[1].split('/')[0]
+        decoded = EmailVerificationTokenGenerator.decode_token(token)
+        self.assertEqual(decoded['email'], 'user2@example.com')
+        self.assertTrue(EmailVerificationTokenGenerator().check_token(self.users[2], decoded['token']))
+
+    def test_queries_per_chunk(self):
+        # Test each chunk is queued with a fixed number of queries however many users it holds
+        User.objects.filter(pk__in=[user.pk for user in self.users[:2]]).delete()
+        with self.assertNumQueries(5):
+            # Select users, then a savepoint, insert, update and release for the chunk
+            queue_verification_emails(chunk_size=10)
@@ -0,0 +1,101 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils.crypto import get_random_string
+from authentication.models import User, Group, OutboxEmail
+from kbase.models import Article
+
+# Generate a random user password for test accounts
+TEST_USER_PASSWORD = get_random_string(length=24)
+
+
+class ImportUsersTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.existing = User.objects.create_user(
+            email='existing@example.com',
+            first_name='Existing',
+            last_name='User',
+            password=TEST_USER_PASSWORD
+        )
+        self.group = Group.objects.create(name='support')
+
+    def write(self, name, text):
+        path = Path(self.directory.name) / name
+        path.write_text(text)
+        return str(path)
+
+    def import_users(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_users', path, *args, '--hash-workers', '2', stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv(self):
+        # Test valid rows are imported in batches with their groups
+        path = self.write('users.csv', (
+            'email,first_name,last_name,password,groups,is_verified\n'
+            f'one@example.com,One,User,{TEST_USER_PASSWORD},support;All Users,true\n'
+            'two@example.com,Two,User,,,\n'
+            'three@example.com,Three,User,,support,\n'
+        ))
+        out, err = self.import_users(path, '--batch-size', '2')
+        self.assertIn('Imported 3 users, skipped 0.', out)
+
+        one = User.objects.get(email='one@example.com')
+        self.assertTrue(one.check_password(TEST_USER_PASSWORD))
+        self.assertTrue(one.is_verified)
+        self.assertEqual(list(one.groups.all()), [self.group])
+        self.assertFalse(User.objects.get(email='two@example.com').has_usable_password())
+        self.assertEqual(self.group.users.count(), 2)
+
+    def test_import_skips_invalid_rows(self):
+        # Test invalid, duplicate and existing users are reported and skipped
+        path = self.write('users.csv', (
+            'email,first_name,last_name,groups\n'
+            'not-an-email,Bad,Email,\n'
+            'bad@example.com,B4d,Name,\n'
+            'existing@example.com,Existing,User,\n'
+            'new@example.com,New,User,\n'
+            'new@example.com,New,User,\n'
+            'group@example.com,Group,User,unknown\n'
+        ))
+        out, err = self.import_users(path)
+        self.assertIn('Imported 1 users, skipped 5.', out)
+        self.assertIn('Line 2: email', err)
+        self.assertIn('Line 3: first_name', err)
+        self.assertIn('Line 4: existing@example.com already exists', err)
+        self.assertIn('Line 6: new@example.com appears more than once', err)
+        self.assertIn('Line 7: unknown groups unknown', err)
+        self.assertTrue(User.objects.filter(email='new@example.com').exists())
+
+    def test_import_jsonl(self):
+        # Test JSONL rows can create groups, queue verification and get article access
+        article = Article.objects.create(title='Support Article', content='Content', created_by=self.existing)
+        article.groups_with_view.add(self.group)
+        rows = [
+            {'email': 'one@example.com', 'first_name': 'One', 'last_name': 'User', 'groups': ['Team', 'support']},
+            {'email': 'two@example.com', 'first_name': 'Two', 'last_name': 'User', 'is_verified': True},
+        ]
+        path = self.write('users.jsonl', '\n'.join(json.dumps(row) for row in rows) + '\nnot json\n')
+        out, err = self.import_users(path, '--create-groups', '--send-verification')
+        self.assertIn('Imported 2 users, skipped 1.', out)
+        self.assertIn('Line 3: invalid JSON', err)
+
+        team = Group.objects.get(name='team')
+        one = User.objects.get(email='one@example.com')
+        self.assertEqual(list(team.users.all()), [one])
+        self.assertEqual(list(OutboxEmail.objects.values_list('recipient', flat=True)), ['one@example.com'])
+
+        # Access is rebuilt for imported group members
+        self.assertEqual(article.get_permissions(one), 'view')
+
+    def test_import_unknown_format(self):
+        path = self.write('users.txt', '')
+        with self.assertRaises(CommandError):
+            self.import_users(path)
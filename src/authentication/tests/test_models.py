@@ -22,7 +22,8 @@ class UserModelTestCase(TestCase):
         self.assertEqual(user.email, 'testuser@example.com')
         self.assertEqual(user.full_name, 'Test User')
         self.assertTrue(user.check_password(TEST_USER_PASSWORD))
-        self.assertIn(self.all_users_group, user.groups.all())
+        # 'All Users' membership is implicit so no row is stored
+        self.assertNotIn(self.all_users_group, user.groups.all())
         self.assertEqual(user.is_admin, False)
 
     def test_delete_user(self):
@@ -49,7 +50,8 @@ class UserModelTestCase(TestCase):
         self.assertEqual(user.email, 'testuser@example.com')
         self.assertEqual(user.full_name, 'Test User')
         self.assertTrue(user.check_password(TEST_USER_PASSWORD))
-        self.assertIn(self.all_users_group, user.groups.all())
+        # 'All Users' membership is implicit so no row is stored
+        self.assertNotIn(self.all_users_group, user.groups.all())
         self.assertEqual(user.is_admin, False)
 
         # Edit the user
@@ -68,6 +70,23 @@ class UserModelTestCase(TestCase):
         self.assertEqual(edited_user.email, 'accountest@example.com')
         self.assertEqual(edited_user.password, 'newpassword123')
 
+    def test_save_existing_user_queries(self):
+        # Test saving an existing user only updates the user row
+        user = User.objects.create_user(
+            email='testuser@example.com',
+            first_name='Test',
+            last_name='User',
+            password=TEST_USER_PASSWORD
+        )
+        user.first_name = 'Account'
+        with self.assertNumQueries(1):
+            user.save()
+        user.is_verified = True
+        with self.assertNumQueries(1):
+            user.save(update_fields=['is_verified'])
+        # 'All Users' membership is implicit so no row is stored
+        self.assertNotIn(self.all_users_group, user.groups.all())
+
     def test_create_user_without_email(self):
         # Test creating a user without email raises ValidationError
         with self.assertRaises(ValidationError):
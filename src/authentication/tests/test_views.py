@@ -1,7 +1,7 @@
 from django.test import TestCase
 from django.urls import reverse
 from django.utils.crypto import get_random_string
-from authentication.models import User
+from authentication.models import User, OutboxEmail
 
 TEST_USER_PASSWORD = get_random_string(length=24)
 
@@ -59,6 +59,27 @@ class UnauthenticatedUserViewsTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'authentication/sign-up.html')
 
+    def test_sign_up_and_verify_queries(self):
+        # Test the queries for a new user signing up and verifying their email
+        # Unique email check, insert user, queue email and record the time sent
+        with self.assertNumQueries(4):
+            response = self.client.post(reverse('sign-up'), {
+                'first_name': 'New',
+                'last_name': 'User',
+                'email': 'newuser@example.com',
+                'password1': 'djangopassword123',
+                'password2': 'djangopassword123'
+            })
+        self.assertRedirects(response, reverse('sign-in'))
+
+        body = OutboxEmail.objects.get(recipient='newuser@example.com').body
+        token = body.split('/verify/')[1].split('/')[0]
+        # Get the user and mark them verified
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('verify-email', kwargs={'token': token}))
+        self.assertRedirects(response, reverse('sign-in'))
+        self.assertTrue(User.objects.get(email='newuser@example.com').is_verified)
+
     def test_get_verify_view(self):
         # Test sign in view returns the correct template successfully
         response = self.client.get(reverse('verify-email', kwargs={'token': get_random_string(32)}))
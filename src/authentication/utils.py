@@ -1,10 +1,20 @@
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from django.core.mail import send_mail
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
 from django.utils.timezone import now
 from datetime import timedelta
 from django.conf import settings
 from django.utils.encoding import force_bytes, force_str, DjangoUnicodeDecodeError
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from .backends import get_user_cache_key
+from .models import Group, OutboxEmail, User
+
+# Minimum time between verification emails to the same user
+VERIFICATION_EMAIL_INTERVAL = timedelta(minutes=15)
+VERIFICATION_EMAIL_SUBJECT = "Verify Your Email"
 
 
 class InvalidTokenError(Exception):
@@ -59,21 +69,255 @@ class EmailVerificationTokenGenerator(PasswordResetTokenGenerator):
         return f"{user.pk}{user.password}{joined_timestamp}{timestamp}{email}"
 
 
+def queue_email(subject, message, recipient_list, from_email=None):
+    """
+    Adds an email to the outbox for each recipient. The send_queued_email command sends them.
+
+    Parameters
+    ----------
+    subject: str
+        email subject
+    message: str
+        plain text email body
+    recipient_list: list
+        recipient email addresses
+    from_email: str
+        sender email (default is DEFAULT_FROM_EMAIL)
+
+    Returns
+    -------
+    list of queued OutboxEmail objects
+    """
+    return OutboxEmail.objects.bulk_create(
+        OutboxEmail(
+            subject=subject,
+            body=message,
+            from_email=from_email or '',
+            recipient=recipient,
+        ) for recipient in recipient_list
+    )
+
+
+def send_queued_emails(batch_size=100, max_attempts=8, retry_delay=timedelta(minutes=1),
+                       claim_timeout=timedelta(minutes=10), connection=None):
+    """
+    Sends a batch of due emails over a single mail server connection.
+    Emails which fail are left in the outbox with the error and retried after a delay which doubles on each
+    attempt, so the default 8 attempts cover a mail server outage of about two hours before they are given up on.
+    Emails are claimed in a short transaction and sent after it commits, so no row locks are held while waiting on
+    the mail server and several workers can drain the outbox at once.
+
+    Parameters
+    ----------
+    batch_size: int
+        maximum number of emails to send
+    max_attempts: int
+        number of tries before an email is given up on
+    retry_delay: timedelta
+        time to wait before retrying an email after its first failure
+    claim_timeout: timedelta
+        time before an email claimed by a worker which stopped before recording the result is tried again
+    connection:
+        email backend connection to keep open between batches (default is a new connection for this batch)
+
+    Returns
+    -------
+    tuple of the number of emails sent and failed
+    """
+    sent = failed = 0
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(sent_date__isnull=True, attempts__lt=max_attempts, next_attempt_date__lte=now())
+            .order_by('id')[:batch_size]
+        )
+        if not emails:
+            return sent, failed
+        # Hold the emails back from other workers while they are sent
+        claimed_until = now() + claim_timeout
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+            attempts=F('attempts') + 1,
+            next_attempt_date=claimed_until,
+        )
+        for email in emails:
+            email.attempts += 1
+            email.next_attempt_date = claimed_until
+
+    close_connection = connection is None
+    connection = connection or get_connection()
+    try:
+        for email in emails:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                # Falls back to DEFAULT_FROM_EMAIL when no sender was given
+                from_email=email.from_email or None,
+                to=[email.recipient],
+                connection=connection,
+            )
+            try:
+                # Does nothing if the connection is already open
+                connection.open()
+                message.send()
+            except Exception as e:
+                email.last_error = str(e)
+                email.next_attempt_date = now() + retry_delay * 2 ** (email.attempts - 1)
+                failed += 1
+                # Drop the connection in case it is broken, it is reopened for the next email
+                connection.close()
+            else:
+                email.sent_date = now()
+                email.last_error = ''
+                sent += 1
+    finally:
+        if close_connection:
+            connection.close()
+        # Emails not reached because of an unexpected error keep their claim and are retried after claim_timeout
+        OutboxEmail.objects.bulk_update(emails, ['attempts', 'sent_date', 'next_attempt_date', 'last_error'])
+    return sent, failed
+
+
+def purge_sent_emails(days=7):
+    """
+    Deletes emails which were sent more than the given number of days ago.
+
+    Returns
+    -------
+    number of emails deleted
+    """
+    deleted, _ = OutboxEmail.objects.filter(sent_date__lt=now() - timedelta(days=days)).delete()
+    return deleted
+
+
+def get_verification_link(user, token_generator=None):
+    """
+    Creates the link a user follows to verify their email.
+    """
+    token = (token_generator or EmailVerificationTokenGenerator()).make_token(user)
+    return f"{settings.SITE_URL}/verify/{token}/"
+
+
+def get_verification_message(user, verification_link):
+    """
+    Creates the body of the verification email.
+    """
+    return (f"Hi {user.first_name},\n\nPlease verify your email by clicking the link below:\n"
+            f"{verification_link}\n\nThank you!")
+
+
 def send_verification_email(user, verification_link):
     """
-    Sends a verification email to user and updates the database with the date and time sent.
+    Queues a verification email to user and updates the database with the date and time requested.
     """
     # Check that the user hasn't requested an email in the last 15 minutes
-    if user.last_verification_email_sent and now() < user.last_verification_email_sent + timedelta(minutes=15):
+    if user.last_verification_email_sent and now() < user.last_verification_email_sent + VERIFICATION_EMAIL_INTERVAL:
         raise EmailRequestTooSoonError
 
-    send_mail(
-        subject="Verify Your Email",
-        message=f"Hi {user.first_name},\n\nPlease verify your email by clicking the link below:\n{verification_link}\n\nThank you!",
-        from_email=settings.DEFAULT_FROM_EMAIL,
+    queue_email(
+        subject=VERIFICATION_EMAIL_SUBJECT,
+        message=get_verification_message(user, verification_link),
         recipient_list=[user.email],
     )
 
     # Update the database with the time email sent.
     user.last_verification_email_sent = now()
-    user.save()
+    user.save(update_fields=['last_verification_email_sent'])
+
+
+def queue_verification_emails(users=None, chunk_size=500):
+    """
+    Queues verification emails for every unverified user who has not had one recently.
+    Users are streamed from the database in chunks so large numbers of users are never loaded at once,
+    and each chunk is queued with one insert and one update.
+
+    Parameters
+    ----------
+    users: QuerySet
+        users to consider (default is all users)
+    chunk_size: int
+        number of users to queue per transaction
+
+    Returns
+    -------
+    number of emails queued
+    """
+    users = (User.objects.all() if users is None else users).filter(
+        Q(last_verification_email_sent__isnull=True)
+        | Q(last_verification_email_sent__lt=now() - VERIFICATION_EMAIL_INTERVAL),
+        is_verified=False,
+    ).only('pk', 'email', 'first_name', 'password', 'date_joined').order_by('pk')
+
+    token_generator = EmailVerificationTokenGenerator()
+    queued = 0
+    chunk = []
+    for user in users.iterator(chunk_size=chunk_size):
+        chunk.append(user)
+        if len(chunk) == chunk_size:
+            queued += _queue_verification_chunk(chunk, token_generator)
+            chunk = []
+    if chunk:
+        queued += _queue_verification_chunk(chunk, token_generator)
+    return queued
+
+
+def _queue_verification_chunk(users, token_generator):
+    sent_date = now()
+    user_ids = [user.pk for user in users]
+    with transaction.atomic():
+        OutboxEmail.objects.bulk_create(
+            OutboxEmail(
+                subject=VERIFICATION_EMAIL_SUBJECT,
+                body=get_verification_message(user, get_verification_link(user, token_generator)),
+                recipient=user.email,
+            ) for user in users
+        )
+        User.objects.filter(pk__in=user_ids).update(last_verification_email_sent=sent_date)
+    # update() skips the signal which clears cached users
+    cache.delete_many([get_user_cache_key(user_id) for user_id in user_ids])
+    return len(users)
+
+
+def check_import_groups(names, groups, create_groups):
+    """
+    Checks the group names of an imported row against the existing groups.
+
+    Parameters
+    ----------
+    names: set
+        lower cased group names from the row
+    groups: dict
+        existing group ids by name
+    create_groups: bool
+        whether groups which do not exist will be created
+
+    Returns
+    -------
+    error message if the row should be skipped, otherwise None
+    """
+    unknown = names - groups.keys()
+    if unknown and not create_groups:
+        return f'unknown groups {", ".join(sorted(unknown))}'
+    try:
+        for name in unknown:
+            Group._meta.get_field('name').run_validators(name)
+    except ValidationError as e:
+        return f'groups: {" ".join(e.messages)}'
+    return None
+
+
+def add_missing_groups(names, groups):
+    """
+    Creates the groups which do not exist yet with one insert and adds them to groups.
+
+    Parameters
+    ----------
+    names: set
+        lower cased group names needed
+    groups: dict
+        existing group ids by name, updated with the created groups
+    """
+    missing = names - groups.keys()
+    if missing:
+        # Group.save lower cases names, bulk_create does not so names are already lower cased
+        for group in Group.objects.bulk_create([Group(name=name) for name in sorted(missing)]):
+            groups[group.name] = group.pk
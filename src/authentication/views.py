@@ -4,11 +4,11 @@ from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
 from django.utils.decorators import method_decorator
 from django.views.generic import FormView
-from django.conf import settings
 from django.views.generic.base import View
 from django.contrib import messages
 from .forms import SignUpForm, SignInForm
-from .utils import EmailVerificationTokenGenerator, InvalidTokenError, send_verification_email, EmailRequestTooSoonError
+from .utils import (EmailVerificationTokenGenerator, InvalidTokenError, send_verification_email, EmailRequestTooSoonError,
+                    get_verification_link)
 from .models import User
 
 # Decorator required because by default ALL views require login
@@ -42,20 +42,14 @@ class SignUpView(FormView):
     success_url = reverse_lazy('sign-in')
 
     def form_valid(self, form):
-        email = form.cleaned_data.get('email')
-        if User.objects.filter(email=email).exists():
-            form.add_error('email', 'A user with this email already exists.')
-            return self.form_invalid(form)
-
+        # The form has already checked the email is not in use
         user = form.save()
         # Make the first registered user an admin
         if user.pk == 1:
             user.is_admin = True
-            user.save()
+            user.save(update_fields=['is_admin'])
 
-        token = EmailVerificationTokenGenerator().make_token(user)
-        verification_link = f"{settings.SITE_URL}/verify/{token}/"
-        send_verification_email(user, verification_link)
+        send_verification_email(user, get_verification_link(user))
         messages.success(self.request, 'Thank you for signing up! Please check your email for verification link.')
         return super().form_valid(form)
 
@@ -95,7 +89,7 @@ class VerifyEmailView(View):
             # Check the real token
             if token_generator.check_token(user, token):
                 user.is_verified = True
-                user.save()
+                user.save(update_fields=['is_verified'])
                 messages.success(request, 'Your email has been successfully verified!')
                 return redirect(reverse_lazy('sign-in'))
 
@@ -128,10 +122,8 @@ class ReVerifyEmailView(View):
     def post(self, request, *args, **kwargs):
         user = request.user
         if not user.is_verified:
-            token = EmailVerificationTokenGenerator().make_token(user)
-            verification_link = f"{settings.SITE_URL}/verify/{token}/"
             try:
-                send_verification_email(user, verification_link)
+                send_verification_email(user, get_verification_link(user))
                 messages.success(request, 'Verification email has been sent.')
             except EmailRequestTooSoonError:
                 messages.warning(self.request, 'A verification link has been sent been sent recently. '
@@ -1,34 +1,77 @@
-from django.urls import reverse, resolve
+import random
+from time import time
+
+from django.conf import settings
+from django.urls import reverse
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.utils.deprecation import MiddlewareMixin
 
+from .routers import set_read_database
+
 class VerifiedUserMiddleware(MiddlewareMixin):
     """
     Custom middleware to redirect unverified users when they log in.
     This will prevent them from accessing anything inside the application until they are verified.
     """
-    def __init__(self, get_response=None):
-        super().__init__(get_response)
-        # Views that are allowed without verification
-        self.allowed_views = (
-            'verify-email',
-            'sign-out',
-            're-verify'
-        )
+    # Views that are allowed without verification
+    allowed_views = frozenset((
+        'verify-email',
+        'sign-out',
+        're-verify',
+    ))
 
     def process_view(self, request, view_func, view_args, view_kwargs):
         """
         Checks if the user is verified and redirects them to the re-verification page if they are not.
         """
-        # Do nothing to unauthenticated users
-        if not request.user.is_authenticated:
+        user = request.user
+        # Do nothing to verified users, anonymous users have no is_verified attribute
+        if getattr(user, 'is_verified', False):
             return None
-        # Do nothing to verified users
-        elif request.user.is_verified:
+        # Do nothing to unauthenticated users
+        if not user.is_authenticated:
             return None
-        # Redirect unverified users to the reverify page
-        elif resolve(request.path).view_name not in self.allowed_views:
+        # Redirect unverified users to the reverify page, the view has already been resolved for this request
+        if request.resolver_match.view_name not in self.allowed_views:
             messages.warning(request, 'Your account is not verified. '
                                       'Check your email or request a new verification link.')
             return redirect(reverse('re-verify'))
+        return None
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    """
+    Routes the reads of read only views to a random replica from settings.DATABASE_REPLICAS.
+    Views opt in with a use_replica class attribute and only GET and HEAD requests are routed.
+    A client which has just made a write request is sent to the primary for REPLICA_READ_YOUR_WRITES seconds,
+    so it always sees its own changes even when the replicas are behind.
+    """
+    # Cookie holding the time until which the client reads from the primary
+    cookie_name = 'kbase_primary_until'
+    safe_methods = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.DATABASE_REPLICAS or request.method not in ('GET', 'HEAD'):
+            return None
+        if not getattr(getattr(view_func, 'view_class', view_func), 'use_replica', False):
+            return None
+        try:
+            primary_until = float(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            primary_until = 0
+        if primary_until > time():
+            return None
+        request.read_database = random.choice(settings.DATABASE_REPLICAS)
+        set_read_database(request.read_database)
+        return None
+
+    def process_response(self, request, response):
+        # Requests start on the primary, don't leave the replica selected for whatever the thread runs next
+        if getattr(request, 'read_database', None):
+            set_read_database(None)
+        if settings.DATABASE_REPLICAS and request.method not in self.safe_methods:
+            window = settings.REPLICA_READ_YOUR_WRITES
+            response.set_cookie(self.cookie_name, str(time() + window), max_age=window,
+                                httponly=True, samesite='Lax', secure=request.is_secure())
+        return response
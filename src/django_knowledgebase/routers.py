@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Database reads are sent to for the current request, None reads from the primary.
+# A context variable keeps concurrent requests in threads or async tasks apart.
+_read_database = ContextVar('kbase_read_database', default=None)
+
+
+def get_read_database():
+    """
+    Get the replica reads are currently routed to.
+    return: database alias or None for the primary
+    """
+    return _read_database.get()
+
+
+def set_read_database(alias):
+    """
+    Route reads to the given replica, None routes them to the primary.
+    """
+    _read_database.set(alias)
+
+
+@contextmanager
+def read_from(alias):
+    """
+    Route reads inside the block to the given replica, None routes them to the primary.
+    """
+    token = _read_database.set(alias)
+    try:
+        yield
+    finally:
+        _read_database.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a replica while one is selected with read_from, by ReplicaMiddleware for read only views.
+    Writes always go to the primary and switch the rest of the block back to the primary,
+    so anything read after a write sees it.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_database.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        _read_database.set(None)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
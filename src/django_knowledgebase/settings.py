@@ -12,11 +12,15 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 from sys import argv
-from app_config import DjangoSettings, DbSettings, EmailSettings, generate_secret_key
+from app_config import DjangoSettings, DbSettings, EmailSettings, CacheSettings, generate_secret_key
 
 django_settings = DjangoSettings()
 db_settings = DbSettings()
 email_settings = EmailSettings()
+cache_settings = CacheSettings()
+
+# Tests, and benchmarks without a Postgres host, run against a throwaway in-memory SQLite database
+TESTING = 'test' in argv or ('benchmark' in argv and not db_settings.host)
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -26,7 +30,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
 # Use random secret key for testing
-if 'test' in argv:
+if TESTING:
     SECRET_KEY = generate_secret_key()
 else:
     SECRET_KEY = django_settings.secret_key
@@ -55,6 +59,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 MIDDLEWARE = [
@@ -66,7 +71,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.contrib.auth.middleware.LoginRequiredMiddleware',
-    'django_knowledgebase.middleware.VerifiedUserMiddleware'
+    'django_knowledgebase.middleware.VerifiedUserMiddleware',
+    'django_knowledgebase.middleware.ReplicaMiddleware',
 ]
 # 'django.contrib.auth.middleware.LoginRequiredMiddleware' sets default view behaviour to login required.
 
@@ -95,21 +101,44 @@ WSGI_APPLICATION = 'django_knowledgebase.wsgi.application'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'HOST': db_settings.host,
-        "PASSWORD": db_settings.password,
-        'USER': db_settings.user,
-        'PORT': db_settings.port,
-        'NAME': db_settings.name,
-    }
+    'default': db_settings.get_database_config(),
+    **db_settings.get_replica_configs(),
 }
 
 # Use in-memory SQLite for testing
-if 'test' in argv:
-    DATABASES['default'] = {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': ':memory:'
+if TESTING:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:'
+        }
+    }
+
+# wsgi or asgi, the read views are routed to their async versions in asgi mode.
+# Django does not support persistent connections under ASGI as they are not closed reliably between requests.
+# Use POSTGRES_POOL to reuse connections instead.
+SERVER_MODE = django_settings.server_mode
+if SERVER_MODE == 'asgi':
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 0
+
+# Read only views read from a random replica, see django_knowledgebase.middleware.ReplicaMiddleware.
+# Clients read from the primary for REPLICA_READ_YOUR_WRITES seconds after making a change.
+DATABASE_ROUTERS = ['django_knowledgebase.routers.ReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+REPLICA_READ_YOUR_WRITES = db_settings.replica_read_your_writes
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': cache_settings.get_cache_config()
+}
+
+# Use a per-process in-memory cache for testing
+if TESTING:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 
 # Password validation
@@ -134,6 +163,15 @@ LOGIN_URL = '/sign-in/'
 
 AUTH_USER_MODEL = "authentication.User"
 
+# Load the signed in user from the cache instead of the database on every request. ModelBackend is kept after it
+# as sessions store the backend which signed the user in and are rejected if that backend is no longer listed
+if cache_settings.cache_users:
+    AUTHENTICATION_BACKENDS = [
+        'authentication.backends.CachedModelBackend',
+        'django.contrib.auth.backends.ModelBackend',
+    ]
+
+SESSION_ENGINE = django_settings.session_engines[django_settings.session_engine]
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 7
 
 # Internationalization
@@ -161,7 +199,8 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Email Settings
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = email_settings.backends[email_settings.backend]
+EMAIL_FILE_PATH = email_settings.file_path
 EMAIL_HOST = email_settings.host
 EMAIL_PORT = email_settings.port
 EMAIL_USE_TLS = email_settings.use_tls
@@ -0,0 +1,30 @@
+# Gunicorn configuration, loaded automatically when gunicorn is started from this directory.
+# Every setting can be changed with the environment variables read by app_config.GunicornSettings.
+from app_config import DjangoSettings, GunicornSettings
+
+django_settings = DjangoSettings()
+gunicorn_settings = GunicornSettings()
+
+bind = ':8000'
+workers = gunicorn_settings.workers
+threads = gunicorn_settings.threads
+preload_app = gunicorn_settings.preload
+keepalive = gunicorn_settings.keepalive
+max_requests = gunicorn_settings.max_requests
+max_requests_jitter = gunicorn_settings.max_requests_jitter
+timeout = gunicorn_settings.timeout
+graceful_timeout = gunicorn_settings.graceful_timeout
+
+if django_settings.server_mode == 'asgi':
+    # Each Uvicorn worker serves many connections from its event loop, threads are not used
+    wsgi_app = 'django_knowledgebase.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'django_knowledgebase.wsgi:application'
+    worker_class = 'gthread' if threads > 1 else 'sync'
+
+
+def post_fork(server, worker):
+    # With preload_app the application is loaded before forking, make sure no worker inherits a database connection
+    from django.db import connections
+    connections.close_all()
@@ -97,6 +97,10 @@ class AuthenticatedUrlsTestCase(TestCase):
         response = self.client.post(reverse('set-permissions', kwargs={'pk': self.user2.pk}))
         self.assertRedirects(response, reverse('dashboard'))
 
+    def test_resend_verification_url(self):
+        response = self.client.post(reverse('resend-verification'))
+        self.assertRedirects(response, reverse('dashboard'))
+
     def test_all_groups_url(self):
         response = self.client.get(reverse('all-groups'))
         self.assertRedirects(response, reverse('dashboard'))
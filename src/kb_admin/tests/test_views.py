@@ -1,5 +1,5 @@
 from django.urls import reverse
-from authentication.models import User, Group
+from authentication.models import User, Group, OutboxEmail
 from django.test import TestCase
 from django.utils.crypto import get_random_string
 
@@ -137,12 +137,47 @@ class AuthenticatedUrlsTestCase(TestCase):
         test_user.refresh_from_db()
         self.assertTrue(test_user.is_admin)
 
+    def test_resend_verification_view(self):
+        # Test resend verification queues an email for each unverified user
+        response = self.client.post(reverse('resend-verification'))
+        self.assertRedirects(response, reverse('all-users'))
+        self.assertEqual(
+            set(OutboxEmail.objects.values_list('recipient', flat=True)),
+            {self.user2.email, self.user3.email, self.user4.email, self.user5.email}
+        )
+
+        # Test users are not sent another email straight away
+        self.client.post(reverse('resend-verification'))
+        self.assertEqual(OutboxEmail.objects.count(), 4)
+
     def test_all_groups_view(self):
         # Test all groups view returns the correct template successfully
         response = self.client.get(reverse('all-groups'))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'kb_admin/groups.html')
 
+    def test_all_groups_view_member_counts(self):
+        # Test member counts come from one query, with every user counted in 'All Users'
+        response = self.client.get(reverse('all-groups'))
+        counts = {group.name: group.member_count for group in response.context['groups']}
+        self.assertEqual(counts['group 1'], 3)
+        self.assertEqual(counts['group 3'], 0)
+        self.assertEqual(response.context['total_users'], 5)
+        self.assertContains(response, '<td>5</td>', html=True)
+
+    def test_all_users_group_detail_view(self):
+        # Test 'All Users' shows every user is a member without listing them
+        response = self.client.get(reverse('group-detail', kwargs={'pk': 1}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['protected_group'])
+        self.assertContains(response, 'Every user is a member')
+
+    def test_user_detail_view_groups(self):
+        # Test user details lists 'All Users' with the user's other groups
+        response = self.client.get(reverse('user-detail', kwargs={'pk': self.user2.pk}))
+        self.assertContains(response, 'All Users')
+        self.assertContains(response, 'Group 1')
+
     def test_group_detail_view(self):
         # Test group details view returns the correct template successfully
         response = self.client.get(reverse('group-detail', kwargs={'pk': self.group2.pk}))
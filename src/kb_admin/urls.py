@@ -5,6 +5,7 @@ from . import views
 urlpatterns = [
     path('', views.DashboardAdminView.as_view(), name='admin-dashboard'),
     path('user/', views.UsersAdminView.as_view(), name='all-users'),
+    path('user/resend-verification/', views.ResendVerificationAdminView.as_view(), name='resend-verification'),
     path('user/<int:pk>', views.UserDetailsAdminView.as_view(), name='user-detail'),
     path('user/<int:pk>/delete/', views.UserDeleteAdminView.as_view(), name='user-delete'),
     path('user/<int:pk>/set-permissions/', views.UserSetPermissionsAdminView.as_view(), name='set-permissions'),
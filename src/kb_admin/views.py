@@ -1,11 +1,13 @@
 from django.core.exceptions import PermissionDenied
+from django.db.models import Count
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.views.generic import TemplateView, ListView, DetailView, DeleteView, View, CreateView, UpdateView
 from .forms import GroupForm
 from .mixins import AdminRequiredMixin
 from kbase.models import Article
-from authentication.models import User, Group
+from authentication.models import User, Group, ALL_USERS_GROUP_ID
+from authentication.utils import queue_verification_emails
 from django.contrib import messages
 
 
@@ -31,6 +33,8 @@ class UsersAdminView(AdminRequiredMixin, ListView):
     template_name = 'kb_admin/users.html'
     model = User
     context_object_name = 'users'
+    # Read only, served from a database replica by ReplicaMiddleware
+    use_replica = True
 
 
 class UserDetailsAdminView(AdminRequiredMixin, DetailView):
@@ -38,6 +42,12 @@ class UserDetailsAdminView(AdminRequiredMixin, DetailView):
     model = User
     context_object_name = 'user'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Every user is in 'All Users' without a stored membership
+        context['all_users_group'] = Group.objects.get(pk=ALL_USERS_GROUP_ID)
+        return context
+
 
 class UserDeleteAdminView(AdminRequiredMixin, DeleteView):
     model = User
@@ -67,7 +77,7 @@ class UserSetPermissionsAdminView(AdminRequiredMixin, View):
             messages.error(self.request, 'You cannot toggle admin for yourself.')
         else:
             user.is_admin = not user.is_admin
-            user.save()
+            user.save(update_fields=['is_admin'])
             if user.is_admin:
                 messages.success(self.request, f'{user.full_name} is now an admin.')
             else:
@@ -76,10 +86,33 @@ class UserSetPermissionsAdminView(AdminRequiredMixin, View):
         return redirect(reverse_lazy('user-detail', kwargs={'pk': user.pk}))
 
 
+class ResendVerificationAdminView(AdminRequiredMixin, View):
+    def post(self, request, *args, **kwargs):
+        # Emails are only queued here, the email worker sends them
+        queued = queue_verification_emails()
+        if queued:
+            messages.success(self.request, f'Verification emails queued for {queued} unverified users.')
+        else:
+            messages.info(self.request, 'There are no unverified users waiting for a verification email.')
+        return redirect(reverse_lazy('all-users'))
+
+
 class GroupsAdminView(AdminRequiredMixin, ListView):
     template_name = 'kb_admin/groups.html'
     model = Group
     context_object_name = 'groups'
+    use_replica = True
+
+    def get_queryset(self):
+        # Count members in the same query rather than loading every group's users
+        return super().get_queryset().annotate(member_count=Count('users'))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Members of 'All Users' are not stored, everyone is a member
+        context['all_users_group_id'] = ALL_USERS_GROUP_ID
+        context['total_users'] = User.objects.count()
+        return context
 
 
 class GroupDetailsAdminView(AdminRequiredMixin, DetailView):
@@ -90,7 +123,7 @@ class GroupDetailsAdminView(AdminRequiredMixin, DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         group = self.get_object()
-        if group.pk == 1:
+        if group.pk == ALL_USERS_GROUP_ID:
             context['protected_group'] = True
         return context
 
@@ -122,7 +155,7 @@ class EditGroupAdminView(AdminRequiredMixin, UpdateView):
 
     def dispatch(self, request, *args, **kwargs):
         group = self.get_object()
-        if group.pk == 1:
+        if group.pk == ALL_USERS_GROUP_ID:
             messages.error(self.request, 'You cannot edit the "All Users" group.')
             raise PermissionDenied('You cannot edit the "All Users" group.')
         return super().dispatch(request, *args, **kwargs)
@@ -135,7 +168,7 @@ class GroupDeleteAdminView(AdminRequiredMixin, DeleteView):
 
     def dispatch(self, request, *args, **kwargs):
         group = self.get_object()
-        if group.pk == 1:
+        if group.pk == ALL_USERS_GROUP_ID:
             messages.error(self.request, 'You cannot delete the "All Users" group.')
             raise PermissionDenied('You cannot delete the "All Users" group.')
         return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,127 @@
+from django.apps import apps as global_apps
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection, transaction
+from django.db.models import Case, When, Value, Exists, OuterRef
+
+from authentication.models import ALL_USERS_GROUP_ID
+
+# Postgres advisory lock key held while access rows are rebuilt
+ACCESS_REBUILD_LOCK_ID = 4_718_305
+
+
+def rebuild_article_access(articles=None, users=None, apps=global_apps, batch_size=1000):
+    """
+    Recalculate the materialised ArticleAccess rows from article creators and group permissions.
+    Only rows matching the given articles and/or users are replaced, if neither is given every row is rebuilt.
+    The 'All Users' group is skipped, its permission is set on Article.all_users_level instead of a row per user.
+
+    Parameters
+    ----------
+    articles : iterable
+        article ids or queryset to rebuild (default is all articles)
+    users : iterable
+        user ids or queryset to rebuild (default is all users)
+    apps : object
+        app registry to load models from, allows use in migrations
+    batch_size : int
+        number of rows to insert per query
+    """
+    Article = apps.get_model('kbase', 'Article')
+    ArticleAccess = apps.get_model('kbase', 'ArticleAccess')
+    edit_through = Article._meta.get_field('groups_with_edit').remote_field.through
+    view_through = Article._meta.get_field('groups_with_view').remote_field.through
+
+    # Build filters for each source, these must be applied in a single filter() call per queryset so that
+    # the multi-valued group__users lookups share the same join
+    creator_filter = {'created_by__isnull': False}
+    group_filter = {'group__users__isnull': False}
+    existing_filter = {}
+    if articles is not None:
+        creator_filter['pk__in'] = articles
+        group_filter['article__in'] = articles
+        existing_filter['article__in'] = articles
+    if users is not None:
+        creator_filter['created_by__in'] = users
+        group_filter['group__users__in'] = users
+        existing_filter['user__in'] = users
+
+    with transaction.atomic():
+        # Done before taking the lock as it locks article rows, which an article save already holds when it
+        # rebuilds access, so taking them after the lock could deadlock
+        if users is None:
+            _update_all_users_level(Article, view_through, edit_through, articles)
+
+        # Rebuilds for articles and for users overlap through group membership, so they are serialised to stop a
+        # rebuild which read permissions before a concurrent change committed from restoring access it removed
+        _lock_access_rebuild()
+
+        # Resolve levels, edit takes precedence over view
+        levels = {}
+        for through, level in ((view_through, 'view'), (edit_through, 'edit')):
+            queryset = through.objects.filter(**group_filter).exclude(group_id=ALL_USERS_GROUP_ID)
+            for user_id, article_id in queryset.values_list('group__users', 'article_id'):
+                levels[(user_id, article_id)] = level
+        for user_id, article_id in Article.objects.filter(**creator_filter).values_list('created_by_id', 'pk'):
+            levels[(user_id, article_id)] = 'edit'
+
+        ArticleAccess.objects.filter(**existing_filter).delete()
+        ArticleAccess.objects.bulk_create(
+            (ArticleAccess(user_id=user_id, article_id=article_id, level=level)
+             for (user_id, article_id), level in levels.items()),
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+
+
+def rebuild_all_article_access(apps=global_apps, batch_size=1000):
+    """
+    Rebuild every ArticleAccess row, one batch of articles at a time so memory is bounded by the batch size.
+
+    Parameters
+    ----------
+    apps : object
+        app registry to load models from, allows use in migrations
+    batch_size : int
+        number of articles to rebuild per batch and rows to insert per query
+
+    Returns
+    -------
+    int of the number of articles rebuilt
+    """
+    Article = apps.get_model('kbase', 'Article')
+    article_ids = Article.objects.order_by('pk').values_list('pk', flat=True)
+    batch = []
+    total = 0
+    for article_id in article_ids.iterator(chunk_size=batch_size):
+        batch.append(article_id)
+        if len(batch) == batch_size:
+            rebuild_article_access(articles=batch, apps=apps, batch_size=batch_size)
+            total += len(batch)
+            batch = []
+    if batch:
+        rebuild_article_access(articles=batch, apps=apps, batch_size=batch_size)
+        total += len(batch)
+    return total
+
+
+def _lock_access_rebuild():
+    # Held until the transaction ends. Other databases used in development serialise writes already
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [ACCESS_REBUILD_LOCK_ID])
+
+
+def _update_all_users_level(Article, view_through, edit_through, articles):
+    try:
+        Article._meta.get_field('all_users_level')
+    except FieldDoesNotExist:
+        # Migrations before the field was added rebuild access with older models
+        return
+    queryset = Article.objects.all() if articles is None else Article.objects.filter(pk__in=articles)
+    queryset.update(all_users_level=Case(
+        When(Exists(edit_through.objects.filter(article=OuterRef('pk'), group_id=ALL_USERS_GROUP_ID)),
+             then=Value('edit')),
+        When(Exists(view_through.objects.filter(article=OuterRef('pk'), group_id=ALL_USERS_GROUP_ID)),
+             then=Value('view')),
+        default=None,
+    ))
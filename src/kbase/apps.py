@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class KbaseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'kbase'
+
+    def ready(self):
+        # Register signal handlers which maintain ArticleAccess
+        from . import signals  # noqa: F401
@@ -0,0 +1,292 @@
+import random
+import tracemalloc
+from statistics import median
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, resolve
+from django.utils.text import slugify
+
+from authentication.models import User, Group, ALL_USERS_GROUP_ID
+from django_knowledgebase.middleware import VerifiedUserMiddleware
+from .access import rebuild_article_access
+from .models import Article
+from .search import update_search_index
+
+# Words used to generate article content, the search scenarios look for SEARCH_WORD
+WORDS = (
+    'server', 'database', 'backup', 'restore', 'deploy', 'release', 'network', 'firewall', 'certificate',
+    'password', 'rotate', 'incident', 'escalate', 'monitor', 'alert', 'cluster', 'node', 'storage', 'volume',
+    'replica', 'failover', 'upgrade', 'patch', 'rollback', 'pipeline', 'runbook', 'access', 'review',
+)
+SEARCH_WORD = 'failover'
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+
+class BenchmarkData:
+    """
+    Seeds users, groups and articles for benchmarking using bulk inserts.
+    Can be called repeatedly to grow the data set.
+
+    Attributes
+    ----------
+    seed : int
+        random seed so runs are comparable
+    """
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+        self.password = make_password(BENCHMARK_PASSWORD)
+        self.user_count = 0
+        self.group_count = 0
+        self.article_count = 0
+
+    def add(self, users, groups, articles, groups_per_user=3, groups_per_article=2):
+        """
+        Add the given number of users, groups and articles with random group memberships and permissions.
+        """
+        Group.objects.bulk_create(
+            Group(name=f'benchmark group {self.group_count + i}') for i in range(groups)
+        )
+        self.group_count += groups
+        new_users = User.objects.bulk_create(
+            User(
+                email=f'benchmark{self.user_count + i}@example.com',
+                first_name='Benchmark',
+                last_name='User',
+                password=self.password,
+                is_verified=True,
+            ) for i in range(users)
+        )
+        self.user_count += users
+
+        # Every user is implicitly in 'All Users', add them to some random other groups
+        group_ids = list(Group.objects.values_list('id', flat=True))
+        member_group_ids = [group_id for group_id in group_ids if group_id != ALL_USERS_GROUP_ID]
+        Group.users.through.objects.bulk_create(
+            [Group.users.through(group_id=group_id, user_id=user.id)
+             for user in new_users
+             for group_id in self.random.sample(member_group_ids, min(groups_per_user, len(member_group_ids)))],
+            ignore_conflicts=True,
+        )
+
+        user_ids = list(User.objects.values_list('id', flat=True))
+        new_articles = []
+        for i in range(articles):
+            title = f'Benchmark Article {self.article_count + i}'
+            author = self.random.choice(user_ids)
+            new_articles.append(Article(
+                title=title,
+                slug=slugify(title),
+                content=' '.join(self.random.choices(WORDS, k=200)),
+                created_by_id=author,
+                modified_by_id=author,
+            ))
+        new_articles = Article.objects.bulk_create(new_articles, batch_size=500)
+        self.article_count += articles
+
+        for through in (Article.groups_with_view.through, Article.groups_with_edit.through):
+            through.objects.bulk_create(
+                [through(article_id=article.id, group_id=group_id)
+                 for article in new_articles
+                 for group_id in self.random.sample(group_ids, min(groups_per_article, len(group_ids)))],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+
+        # Bulk inserts skip signals so bring the derived tables up to date
+        article_ids = [article.id for article in new_articles]
+        rebuild_article_access(articles=article_ids)
+        update_search_index(Article, article_ids)
+
+    def summary(self):
+        return {'users': self.user_count, 'groups': self.group_count, 'articles': self.article_count}
+
+
+def measure(request, repeat):
+    """
+    Measure a request function for query count, wall clock time and peak allocated memory.
+
+    Parameters
+    ----------
+    request : callable
+        function making one request and returning the response
+    repeat : int
+        number of timed runs
+
+    Returns
+    -------
+    dict of results
+    """
+    # Warm up connections, caches and lazily imported code
+    request()
+
+    with CaptureQueriesContext(connection) as queries:
+        response = request()
+    # Count now, the captured queries are read from the connection's log which later requests reset
+    query_count = len(queries)
+
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        request()
+        timings.append((perf_counter() - start) * 1000)
+
+    # Memory is measured separately as tracing slows everything down
+    tracemalloc.start()
+    request()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'queries': query_count,
+        'time_ms': {
+            'min': round(min(timings), 3),
+            'median': round(median(timings), 3),
+            'max': round(max(timings), 3),
+        },
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def get_scenarios():
+    """
+    Build the request functions to benchmark, using the first seeded user as a standard user and a new admin user.
+
+    Returns
+    -------
+    dict of scenario name to request function
+    """
+    user = User.objects.filter(is_admin=False).order_by('id').first()
+    admin, _ = User.objects.get_or_create(
+        email='benchmark-admin@example.com',
+        defaults={'first_name': 'Benchmark', 'last_name': 'Admin', 'is_admin': True, 'is_verified': True},
+    )
+    article = Article.objects.visible_to(user).order_by('id').first()
+
+    user_client = Client()
+    user_client.force_login(user)
+    admin_client = Client()
+    admin_client.force_login(admin)
+
+    dashboard = user_client.get(reverse('dashboard'))
+    next_page = {'after': dashboard.context['page_obj'].next_cursor} if dashboard.context['page_obj'].has_next() else {}
+
+    def sign_in():
+        return Client().post(reverse('sign-in'), {'username': user.email, 'password': BENCHMARK_PASSWORD})
+
+    return {
+        'dashboard': lambda: user_client.get(reverse('dashboard')),
+        'dashboard_next_page': lambda: user_client.get(reverse('dashboard'), next_page),
+        'article': lambda: user_client.get(reverse('article', kwargs={'slug': article.slug})),
+        'search': lambda: user_client.get(reverse('dashboard'), {'search': SEARCH_WORD}),
+        'autocomplete': lambda: user_client.get(reverse('article-autocomplete'), {'q': 'benchmark art'}),
+        'admin_dashboard': lambda: admin_client.get(reverse('admin-dashboard')),
+        'admin_users': lambda: admin_client.get(reverse('all-users')),
+        'admin_groups': lambda: admin_client.get(reverse('all-groups')),
+        'sign_in': sign_in,
+    }
+
+
+def measure_middleware(repeat, loops=1000):
+    """
+    Measure the time VerifiedUserMiddleware adds to each request for verified, unverified and anonymous users.
+    The middleware is called directly so the rest of the request does not hide its overhead.
+
+    Parameters
+    ----------
+    repeat : int
+        number of timed runs
+    loops : int
+        middleware calls per timed run
+
+    Returns
+    -------
+    dict of results
+    """
+    middleware = VerifiedUserMiddleware(lambda request: None)
+    users = {
+        'verified': User(email='verified@example.com', is_verified=True),
+        'unverified': User(email='unverified@example.com', is_verified=False),
+        'anonymous': AnonymousUser(),
+    }
+    path = reverse('dashboard')
+    match = resolve(path)
+
+    results = {}
+    for name, user in users.items():
+        request = RequestFactory().get(path)
+        request.user = user
+        request.resolver_match = match
+        request._messages = CookieStorage(request)
+
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            for _ in range(loops):
+                middleware.process_view(request, match.func, match.args, match.kwargs)
+            timings.append((perf_counter() - start) * 1_000_000 / loops)
+        results[name] = {
+            'time_us': {
+                'min': round(min(timings), 3),
+                'median': round(median(timings), 3),
+                'max': round(max(timings), 3),
+            },
+        }
+    return results
+
+
+def run_benchmarks(users, groups, articles, repeat=10, seed=0, scenarios=None):
+    """
+    Seed the database, benchmark every scenario, double the data and benchmark again.
+    Comparing the runs shows which views run more queries as the data grows.
+
+    Parameters
+    ----------
+    users : int
+        users to seed per run
+    groups : int
+        groups to seed per run
+    articles : int
+        articles to seed per run
+    repeat : int
+        timed runs per scenario
+    seed : int
+        random seed
+    scenarios : list
+        names of scenarios to run, including 'middleware' (default is all)
+
+    Returns
+    -------
+    dict of results which can be serialised to JSON
+    """
+    data = BenchmarkData(seed)
+    runs = []
+    for _ in range(2):
+        data.add(users, groups, articles)
+        results = {
+            name: measure(request, repeat)
+            for name, request in get_scenarios().items()
+            if not scenarios or name in scenarios
+        }
+        runs.append({'data': data.summary(), 'results': results})
+
+    query_growth = {
+        name: runs[1]['results'][name]['queries'] - runs[0]['results'][name]['queries']
+        for name in runs[0]['results']
+    }
+    results = {
+        'database': connection.vendor,
+        'repeat': repeat,
+        'runs': runs,
+        'query_growth': query_growth,
+    }
+    # Middleware overhead does not depend on the data so is only measured once
+    if not scenarios or 'middleware' in scenarios:
+        results['middleware'] = measure_middleware(repeat)
+    return results
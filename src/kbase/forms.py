@@ -1,12 +1,15 @@
 from django.core.validators import RegexValidator
-from django.forms import ModelForm, ValidationError, TextInput, SelectMultiple, Textarea
+from django.forms import ModelForm, ValidationError, TextInput, SelectMultiple, Textarea, IntegerField, HiddenInput
 from django.utils.text import slugify
 
 from .models import Article
 
 
 class ArticleForm(ModelForm):
-    reserved_slugs = [ 'new', ]
+    reserved_slugs = [ 'new', 'autocomplete', ]
+    # Version of the article the form was opened on, checked when an edit is saved
+    version = IntegerField(widget=HiddenInput, required=False)
+
     class Meta:
         model = Article
         fields = [
@@ -44,6 +47,11 @@ class ArticleForm(ModelForm):
             }),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['version'].initial = self.instance.version
+
     def clean_title(self):
         title = self.cleaned_data.get('title')
         article_id = self.instance.id
@@ -0,0 +1,66 @@
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from django_knowledgebase.routers import read_from
+from kbase.benchmark import run_benchmarks
+
+
+class Command(BaseCommand):
+    help = ('Benchmark query counts, time and memory of the main views on a throwaway database. '
+            'Uses in-memory SQLite unless a Postgres host is configured.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Users to seed per run (default is 200)')
+        parser.add_argument('--groups', type=int, default=20, help='Groups to seed per run (default is 20)')
+        parser.add_argument('--articles', type=int, default=1000, help='Articles to seed per run (default is 1000)')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed runs per scenario (default is 10)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for generated data (default is 0)')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help='Only run the named scenario, can be repeated')
+        parser.add_argument('--label', default='', help='Label stored with the results, eg. a commit hash')
+        parser.add_argument('--output', help='File to write JSON results to (default is stdout)')
+        parser.add_argument('--fail-on-growth', action='store_true',
+                            help='Exit with an error if any scenario runs more queries as data grows')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Only the primary is replaced by a test database, so keep every read on it rather than on real replicas,
+            # and cache in memory so seeded users and articles never replace real ones with the same ids
+            benchmark_caches = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                            'LOCATION': 'kbase-benchmark'}}
+            with override_settings(DATABASE_REPLICAS=[], CACHES=benchmark_caches), read_from(None):
+                results = run_benchmarks(
+                    users=options['users'],
+                    groups=options['groups'],
+                    articles=options['articles'],
+                    repeat=options['repeat'],
+                    seed=options['seed'],
+                    scenarios=options['scenarios'],
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        results = {
+            'label': options['label'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            **results,
+        }
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+        grown = [name for name, growth in results['query_growth'].items() if growth > 0]
+        if grown and options['fail_on_growth']:
+            raise CommandError(f'Query count grew with data size for: {", ".join(grown)}')
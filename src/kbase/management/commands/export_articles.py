@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from kbase.models import Article
+
+
+def serialise_article(article):
+    """
+    Convert an article and its group permissions to a dictionary for JSONL export.
+    Users and groups are referenced by email and name so they can be matched in another database.
+
+    Parameters
+    ----------
+    article : Article
+        article with created_by, modified_by and both group permissions loaded
+
+    Returns
+    -------
+    dict which can be serialised to JSON
+    """
+    return {
+        'title': article.title,
+        'content': article.content,
+        'created_by': article.created_by.email if article.created_by else None,
+        'created_date': article.created_date.isoformat(),
+        'modified_by': article.modified_by.email if article.modified_by else None,
+        'modified_date': article.modified_date.isoformat(),
+        'groups_with_view': sorted(group.name for group in article.groups_with_view.all()),
+        'groups_with_edit': sorted(group.name for group in article.groups_with_edit.all()),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Export articles with their group permissions as JSONL, one article per line.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='File to write to (default is stdout)')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of articles loaded from the database at a time (default is 1000)')
+
+    def handle(self, *args, **options):
+        # Articles are streamed in chunks with their users and groups fetched per chunk, so memory stays constant
+        articles = (
+            Article.objects.select_related('created_by', 'modified_by')
+            .prefetch_related('groups_with_view', 'groups_with_edit')
+            .defer('search_vector')
+            .order_by('pk')
+            .iterator(chunk_size=options['chunk_size'])
+        )
+        total = 0
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                for article in articles:
+                    file.write(json.dumps(serialise_article(article)) + '\n')
+                    total += 1
+        else:
+            for article in articles:
+                self.stdout.write(json.dumps(serialise_article(article)))
+                total += 1
+        self.stderr.write(f'Exported {total} articles.')
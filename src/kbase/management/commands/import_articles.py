@@ -0,0 +1,171 @@
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+from django.utils.timezone import now
+
+from authentication.models import User, Group
+from authentication.utils import check_import_groups, add_missing_groups
+from kbase.access import rebuild_article_access
+from kbase.forms import ArticleForm
+from kbase.models import Article
+from kbase.revisions import snapshot_revisions
+from kbase.search import update_search_index
+
+PERMISSION_FIELDS = ('groups_with_view', 'groups_with_edit')
+
+
+class Command(BaseCommand):
+    help = ('Import articles from JSONL as written by export_articles. Each line needs a title and content and can '
+            'have created_by and modified_by emails, created_date, modified_date and groups_with_view and '
+            'groups_with_edit group names. Articles whose title is already used are skipped unless --update is given.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSONL file to import')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of articles to insert per transaction (default is 500)')
+        parser.add_argument('--update', action='store_true',
+                            help='Replace the content and permissions of articles which already exist')
+        parser.add_argument('--create-groups', action='store_true',
+                            help='Create groups which do not exist, otherwise articles with unknown groups are skipped')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.update = options['update']
+        self.create_groups = options['create_groups']
+        self.groups = dict(Group.objects.values_list('name', 'pk'))
+        self.seen_slugs = set()
+        self.created = self.updated = self.skipped = 0
+
+        try:
+            with open(options['path'], encoding='utf-8') as file:
+                batch = []
+                for line, text in enumerate(file, start=1):
+                    if not text.strip():
+                        continue
+                    batch.append((line, text))
+                    if len(batch) == self.batch_size:
+                        self.import_batch(batch)
+                        batch = []
+                if batch:
+                    self.import_batch(batch)
+        except OSError as e:
+            raise CommandError(e)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {self.created} articles, updated {self.updated}, skipped {self.skipped}.'
+        ))
+
+    def skip(self, line, message):
+        self.skipped += 1
+        self.stderr.write(f'Line {line}: {message}')
+
+    def parse_line(self, line, text):
+        """
+        Validate a line and build an unsaved article, returns None if the line is skipped.
+        """
+        try:
+            row = json.loads(text)
+        except json.JSONDecodeError as e:
+            return self.skip(line, f'invalid JSON, {e}')
+
+        title = str(row.get('title') or '').strip()
+        # Slugs are generated the same way as Article.save
+        article = Article(title=title, slug=slugify(title), content=row.get('content') or '')
+        try:
+            article.full_clean(exclude=['created_by', 'modified_by'], validate_unique=False)
+        except ValidationError as e:
+            return self.skip(line, '; '.join(f'{field}: {" ".join(errors)}'
+                                             for field, errors in e.message_dict.items()))
+        if article.slug in ArticleForm.reserved_slugs:
+            return self.skip(line, f'the title {title} is reserved')
+        if article.slug in self.seen_slugs:
+            return self.skip(line, f'the title {title} appears more than once')
+
+        permissions = {}
+        for field in PERMISSION_FIELDS:
+            permissions[field] = {str(name).strip().lower() for name in row.get(field) or []}
+        error = check_import_groups(set().union(*permissions.values()), self.groups, self.create_groups)
+        if error:
+            return self.skip(line, error)
+
+        self.seen_slugs.add(article.slug)
+        article._import_line = line
+        article._import_permissions = permissions
+        article._import_users = (row.get('created_by'), row.get('modified_by'))
+        article._import_dates = tuple(parse_datetime(row.get(field) or '') or now()
+                                      for field in ('created_date', 'modified_date'))
+        return article
+
+    def import_batch(self, batch):
+        articles = [article for article in (self.parse_line(line, text) for line, text in batch) if article]
+
+        # Look up conflicting articles and authors once per batch. Slugs are compared as titles
+        # which only differ in case or punctuation share a slug
+        existing = {
+            article.slug: article
+            for article in Article.objects.filter(slug__in=[article.slug for article in articles])
+            .only('pk', 'slug', 'modified_date')
+        }
+        emails = {email for article in articles for email in article._import_users if email}
+        users = dict(User.objects.filter(email__in=emails).values_list('email', 'pk'))
+
+        new_articles, updated_articles = [], []
+        for article in articles:
+            created_by, modified_by = article._import_users
+            article.created_by_id = users.get(created_by)
+            article.modified_by_id = users.get(modified_by)
+            article.created_date, article.modified_date = article._import_dates
+            if article.slug not in existing:
+                new_articles.append(article)
+            elif self.update:
+                article.pk = existing[article.slug].pk
+                # Editors with the article open will get a conflict instead of overwriting the import
+                article.version = F('version') + 1
+                updated_articles.append(article)
+            else:
+                self.skip(article._import_line, f'an article titled {article.title} already exists')
+
+        if not new_articles and not updated_articles:
+            return
+
+        with transaction.atomic():
+            add_missing_groups(set().union(
+                *(names for article in new_articles + updated_articles
+                  for names in article._import_permissions.values())
+            ), self.groups)
+            Article.objects.bulk_create(new_articles)
+            # bulk_create sets the auto dates to now, write back the dates from the file
+            for article in new_articles:
+                article.created_date, article.modified_date = article._import_dates
+            Article.objects.bulk_update(new_articles, ['created_date', 'modified_date'])
+            Article.objects.bulk_update(
+                updated_articles,
+                ['title', 'content', 'created_by', 'modified_by', 'created_date', 'modified_date', 'version'],
+            )
+
+            article_ids = [article.pk for article in new_articles + updated_articles]
+            for field in PERMISSION_FIELDS:
+                through = getattr(Article, field).through
+                through.objects.filter(article_id__in=[article.pk for article in updated_articles]).delete()
+                through.objects.bulk_create(
+                    [through(article_id=article.pk, group_id=self.groups[name])
+                     for article in new_articles + updated_articles
+                     for name in article._import_permissions[field]],
+                    batch_size=self.batch_size,
+                )
+
+            # Bulk writes skip the signals which maintain access, search and revisions
+            rebuild_article_access(articles=article_ids)
+            update_search_index(Article, article_ids)
+            snapshot_revisions(new_articles + updated_articles, batch_size=self.batch_size)
+
+        # Updated articles may keep their modified date so clear the rendered content they had cached
+        cache.delete_many([existing[article.slug].content_cache_key for article in updated_articles])
+        self.created += len(new_articles)
+        self.updated += len(updated_articles)
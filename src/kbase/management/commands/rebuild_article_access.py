@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from kbase.access import rebuild_all_article_access
+from kbase.models import ArticleAccess
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialised article access table from article creators and group permissions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of articles to rebuild per transaction (default is 1000)')
+
+    def handle(self, *args, **options):
+        # Rebuild in batches of articles, each batch replaces every row for its articles in one transaction
+        total = rebuild_all_article_access(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt access for {total} articles ({ArticleAccess.objects.count()} access rows).'
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_article_access(apps, schema_editor):
+    # Batched by article and skipping 'All Users', whose members would need a row for every shared article
+    from kbase.access import rebuild_all_article_access
+    rebuild_all_article_access(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kbase', '0011_alter_article_slug_alter_article_title'),
+        ('authentication', '0013_user_last_verification_email_sent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('view', 'View'), ('edit', 'Edit')], max_length=4)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access', to='kbase.article')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='article_access', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'article'), name='unique_article_access')],
+            },
+        ),
+        migrations.RunPython(populate_article_access, migrations.RunPython.noop),
+    ]
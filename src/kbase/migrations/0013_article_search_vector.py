@@ -0,0 +1,50 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:47
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        # GIN index on the search vector and populate it for existing articles
+        schema_editor.execute(
+            'CREATE INDEX kbase_article_search_vector_gin ON kbase_article USING gin (search_vector)'
+        )
+        schema_editor.execute(
+            "UPDATE kbase_article SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+        )
+    elif vendor == 'sqlite':
+        # FTS5 table used as the search index when running on SQLite, eg. for tests
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE kbase_article_fts USING fts5(title, content, tokenize = 'porter unicode61')"
+        )
+        schema_editor.execute(
+            'INSERT INTO kbase_article_fts (rowid, title, content) SELECT id, title, content FROM kbase_article'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS kbase_article_search_vector_gin')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS kbase_article_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kbase', '0012_article_access'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:48
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+def create_title_trigram_index(apps, schema_editor):
+    # GIN trigram index used by title autocomplete, SQLite uses the FTS5 table instead
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX kbase_article_title_trgm ON kbase_article USING gin (title gin_trgm_ops)'
+        )
+
+
+def drop_title_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS kbase_article_title_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kbase', '0013_article_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_title_trigram_index, drop_title_trigram_index),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0013_user_last_verification_email_sent'),
+        ('kbase', '0014_article_title_trigram'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['modified_date', 'id'], name='kbase_article_modified_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.4 on 2026-10-18 21:02
+
+from django.db import migrations, models
+from django.db.models import Case, When, Value, Exists, OuterRef
+
+ALL_USERS_GROUP_ID = 1
+
+
+def set_all_users_level(apps, schema_editor):
+    # Access rows never include 'All Users' members (see 0012), so only the new field needs setting.
+    # Reversing drops the field, run rebuild_article_access from the release rolled back to afterwards.
+    article = apps.get_model('kbase', 'Article')
+    edit_through = article.groups_with_edit.through
+    view_through = article.groups_with_view.through
+    article.objects.update(all_users_level=Case(
+        When(Exists(edit_through.objects.filter(article=OuterRef('pk'), group_id=ALL_USERS_GROUP_ID)),
+             then=Value('edit')),
+        When(Exists(view_through.objects.filter(article=OuterRef('pk'), group_id=ALL_USERS_GROUP_ID)),
+             then=Value('view')),
+        default=None,
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kbase', '0015_article_modified_idx'),
+        ('authentication', '0015_remove_all_users_members'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='all_users_level',
+            field=models.CharField(choices=[('view', 'View'), ('edit', 'Edit')], editable=False, max_length=4, null=True),
+        ),
+        migrations.RunPython(set_all_users_level, migrations.RunPython.noop),
+    ]
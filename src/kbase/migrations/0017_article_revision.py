@@ -0,0 +1,54 @@
+# Generated by Django 5.1.4 on 2026-10-18 21:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def snapshot_articles(apps, schema_editor):
+    # Record the current content of existing articles as their first revision
+    import zlib
+    Article = apps.get_model('kbase', 'Article')
+    ArticleRevision = apps.get_model('kbase', 'ArticleRevision')
+    revisions = []
+    for article in Article.objects.only('title', 'content', 'modified_by', 'modified_date').iterator(chunk_size=500):
+        revisions.append(ArticleRevision(article_id=article.pk, number=1, title=article.title,
+                                         created_by_id=article.modified_by_id, is_snapshot=True,
+                                         data=zlib.compress(article.content.encode('utf-8'))))
+        if len(revisions) == 500:
+            ArticleRevision.objects.bulk_create(revisions)
+            revisions = []
+    ArticleRevision.objects.bulk_create(revisions)
+    # bulk_create sets created_date to now, use the date the article was last modified instead
+    ArticleRevision.objects.update(
+        created_date=models.Subquery(
+            Article.objects.filter(pk=models.OuterRef('article_id')).values('modified_date')
+        )
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kbase', '0016_article_all_users_level'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=100)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('is_snapshot', models.BooleanField(default=False)),
+                ('data', models.BinaryField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='kbase.article')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='article_revisions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('article', 'number'), name='unique_article_revision')],
+            },
+        ),
+        migrations.RunPython(snapshot_articles, migrations.RunPython.noop),
+    ]
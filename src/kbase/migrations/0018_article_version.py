@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kbase', '0017_article_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
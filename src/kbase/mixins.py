@@ -0,0 +1,56 @@
+from django.contrib import messages
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+
+
+class ArticlePermissionMixin:
+    """
+    Mixin for single article views that resolves the article and the user's permission on it once per request.
+    The article's authors and group permissions are fetched with it for display.
+    """
+    # Permissions which are allowed to access the view
+    required_permissions = ('view', 'edit')
+    # Message shown when access is denied
+    permission_denied_message = None
+
+    def get_queryset(self):
+        return super().get_queryset().select_related(
+            'modified_by', 'created_by'
+        ).prefetch_related(
+            'groups_with_view', 'groups_with_edit'
+        ).defer('search_vector')
+
+    def get_object(self, queryset=None):
+        # Only fetch the article once, dispatch and the request handlers share it
+        if not hasattr(self, '_article'):
+            self._article = super().get_object(queryset)
+        return self._article
+
+    def handle_no_permission(self):
+        if self.permission_denied_message:
+            messages.error(self.request, self.permission_denied_message)
+        raise PermissionDenied()
+
+    def dispatch(self, request, *args, **kwargs):
+        self.permission = self.get_object().get_permissions(request.user)
+        if self.permission not in self.required_permissions:
+            return self.handle_no_permission()
+        return super().dispatch(request, *args, **kwargs)
+
+
+class AsyncArticlePermissionMixin(ArticlePermissionMixin):
+    """
+    ArticlePermissionMixin for views whose handlers are all async.
+    The article and permission are fetched with the async ORM so the view never blocks on the database.
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        try:
+            self._article = await queryset.aget(**{self.slug_field: kwargs[self.slug_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404(f'No {queryset.model._meta.verbose_name} found matching the query')
+        self.permission = await self._article.aget_permissions(request.user)
+        if self.permission not in self.required_permissions:
+            return self.handle_no_permission()
+        # Skip the sync permission check in ArticlePermissionMixin.dispatch
+        return await super(ArticlePermissionMixin, self).dispatch(request, *args, **kwargs)
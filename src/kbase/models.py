@@ -1,11 +1,69 @@
 from django.contrib.auth.models import AnonymousUser
+from django.contrib.postgres.search import SearchVectorField
+from django.core.cache import cache
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import models, transaction
+from django.utils.html import linebreaks
+from django.utils.safestring import mark_safe
 from django.utils.text import slugify
 
 from authentication.models import User, Group
 
 
+class ArticleQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Filter the queryset to articles the given user can view.
+        Mirrors Article.get_permissions but is evaluated by the database in a single query against ArticleAccess
+        and Article.all_users_level.
+
+        Parameters
+        ----------
+        user : object
+            user object to check
+
+        Returns
+        -------
+        QuerySet of articles the user has view or edit permission for
+        """
+        # Deny anonymous users
+        if not user.is_authenticated:
+            return self.none()
+        # Permit admin users everything
+        if user.is_admin:
+            return self.all()
+        # Permit everyone on articles shared with 'All Users', and anyone with a view or edit access row
+        return self.filter(
+            models.Q(all_users_level__isnull=False)
+            | models.Q(pk__in=ArticleAccess.objects.filter(user=user).values('article_id'))
+        )
+
+    def editable_by(self, user):
+        """
+        Filter the queryset to articles the given user can edit.
+
+        Parameters
+        ----------
+        user : object
+            user object to check
+
+        Returns
+        -------
+        QuerySet of articles the user has edit permission for
+        """
+        # Deny anonymous users
+        if not user.is_authenticated:
+            return self.none()
+        # Permit admin users everything
+        if user.is_admin:
+            return self.all()
+        # Permit everyone on articles 'All Users' can edit, and anyone with an edit access row
+        return self.filter(
+            models.Q(all_users_level=ArticleAccess.EDIT)
+            | models.Q(pk__in=ArticleAccess.objects.filter(user=user, level=ArticleAccess.EDIT).values('article_id'))
+        )
+
+
 # Create your models here.
 class Article(models.Model):
     title = models.CharField(unique=True, max_length=100,
@@ -23,11 +81,92 @@ class Article(models.Model):
     modified_date = models.DateTimeField(auto_now=True)
     groups_with_view = models.ManyToManyField(Group, blank=True, related_name='groups_view_articles')
     groups_with_edit = models.ManyToManyField(Group, blank=True, related_name='groups_edit_articles')
+    # Permission given to every user through the virtual 'All Users' group, maintained by
+    # kbase.access.rebuild_article_access so sharing with everyone needs no per user rows
+    all_users_level = models.CharField(max_length=4, null=True, editable=False,
+                                       choices=[('view', 'View'), ('edit', 'Edit')])
+    # Postgres full text search vector, maintained on save by kbase.search.update_search_index
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Incremented on every save so edits based on an old version can be detected, see save_if_unchanged
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = ArticleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Used by keyset pagination on the dashboard
+            models.Index(fields=['modified_date', 'id'], name='kbase_article_modified_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         self.slug = slugify(self.title)
+        if not self._state.adding:
+            self.version += 1
         return super().save(*args, **kwargs)
 
+    def save_if_unchanged(self, version, *args, **kwargs):
+        """
+        Save the article only if nobody else has saved it since the given version was loaded.
+        The version is checked and claimed by a single conditional UPDATE in the same transaction as the save,
+        so no lock is held while the user edits and a concurrent save of the same version waits then fails.
+
+        Parameters
+        ----------
+        version : int
+            version of the article the changes were made to
+
+        Returns
+        -------
+        True if the article was saved, False if it has been saved by someone else since
+        """
+        with transaction.atomic():
+            if not Article.objects.filter(pk=self.pk, version=version).update(version=version + 1):
+                return False
+            # save() increments the version to the one just claimed
+            self.version = version
+            self.save(*args, **kwargs)
+        return True
+
+    @property
+    def content_cache_key(self):
+        """
+        Cache key of the rendered content, it changes whenever the article is saved.
+        """
+        return f'kbase:article-content:{self.pk}:{self.modified_date.timestamp()}'
+
+    @property
+    def rendered_content(self):
+        """
+        Article content rendered as HTML paragraphs. Cached until the article is saved or deleted.
+        """
+        html = cache.get(self.content_cache_key)
+        if html is None:
+            html = linebreaks(self.content, autoescape=True)
+            cache.set(self.content_cache_key, html)
+        return mark_safe(html)
+
+    def _get_permissions_without_query(self, user):
+        """
+        Resolve the permission of a user from the article and user alone.
+
+        Returns
+        -------
+        tuple of whether the permission was resolved and the permission
+        """
+        # Deny anonymous users
+        if isinstance(user, AnonymousUser):
+            return True, None
+        # Permit the creator, compared by id to avoid loading the creator
+        if self.created_by_id == user.pk:
+            return True, 'edit'
+        # Permit admin users
+        if user.is_admin:
+            return True, 'edit'
+        # Permit everyone to edit if 'All Users' can edit
+        if self.all_users_level == ArticleAccess.EDIT:
+            return True, 'edit'
+        return False, None
+
     def get_permissions(self, user):
         """
         Check the permissions of a given user against the Article
@@ -41,27 +180,74 @@ class Article(models.Model):
         -------
         User permission for the article either None, view or edit
         """
-        # Deny anonymous users
-        if isinstance(user, AnonymousUser):
-            return None
-        # Permit the creator
-        if user == self.created_by:
-            return 'edit'
-        # Permit admin users
-        if user.is_admin:
-            return 'edit'
+        resolved, level = self._get_permissions_without_query(user)
+        if resolved:
+            return level
 
-        # Helper function to check if user belongs to any given group set
-        def check_membership(groups):
-            return groups.filter(id__in=user.groups.values_list('id', flat=True)).exists()
+        # Other group permissions are materialised in ArticleAccess, falling back to any 'All Users' permission
+        level = self.access.filter(user=user).values_list('level', flat=True).first()
+        return level or self.all_users_level
 
-        # Permit users in can_view groups
-        if check_membership(self.groups_with_edit):
-            return 'edit'
-        if check_membership(self.groups_with_view):
-            return 'view'
-        # Explicitly deny everything else
-        return None
+    async def aget_permissions(self, user):
+        """
+        Async version of get_permissions for async views.
+        """
+        resolved, level = self._get_permissions_without_query(user)
+        if resolved:
+            return level
+        level = await self.access.filter(user=user).values_list('level', flat=True).afirst()
+        return level or self.all_users_level
 
     def __str__(self):
         return self.title
+
+
+class ArticleAccess(models.Model):
+    """
+    Materialised permission of a user on an article, derived from the article creator and its group permissions.
+    Maintained on write by the signals in kbase.signals so permission checks are a single indexed lookup.
+    Admin access is not stored as it is resolved from User.is_admin.
+    """
+    VIEW = 'view'
+    EDIT = 'edit'
+    LEVEL_CHOICES = [
+        (VIEW, 'View'),
+        (EDIT, 'Edit'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='article_access')
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='access')
+    level = models.CharField(max_length=4, choices=LEVEL_CHOICES)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'article'], name='unique_article_access'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.level} {self.article}'
+
+
+class ArticleRevision(models.Model):
+    """
+    A saved version of an article's title and content, recorded by the signals in kbase.signals.
+    Content is stored compressed, either in full or as a delta against the previous revision,
+    use kbase.revisions.get_revision_content to read it.
+    """
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='revisions')
+    # Revisions are numbered from 1 for each article
+    number = models.PositiveIntegerField()
+    title = models.CharField(max_length=100)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='article_revisions')
+    created_date = models.DateTimeField(auto_now_add=True)
+    # Snapshots hold the full content, other revisions hold the line changes from the previous revision
+    is_snapshot = models.BooleanField(default=False)
+    data = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'number'], name='unique_article_revision'),
+        ]
+
+    def __str__(self):
+        return f'{self.article} revision {self.number}'
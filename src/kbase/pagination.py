@@ -0,0 +1,152 @@
+import binascii
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from datetime import datetime
+
+from django.core.paginator import Paginator, Page, InvalidPage
+from django.http import Http404
+
+
+class KeysetPage:
+    """
+    A page of results from KeysetPaginator with cursors for the neighbouring pages.
+    """
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset ordered by a datetime field and id by seeking past the cursor row instead of using OFFSET.
+    With an index on (field, id) every page costs the same no matter how deep it is.
+
+    Attributes
+    ----------
+    queryset : QuerySet
+        queryset to paginate
+    per_page : int
+        number of objects per page
+    field : str
+        datetime field to order by (default is modified_date)
+    descending : bool
+        newest first (default is True)
+    """
+    def __init__(self, queryset, per_page, field='modified_date', descending=True):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.field = field
+        self.descending = descending
+
+    def encode_cursor(self, obj):
+        value = f'{getattr(obj, self.field).isoformat()}|{obj.pk}'
+        return urlsafe_b64encode(value.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            value, pk = urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(value), int(pk)
+        except (ValueError, UnicodeError, binascii.Error):
+            raise Http404('Invalid page cursor')
+
+    def _order(self, forwards):
+        # Forwards follows the display order, backwards is the reverse of it
+        if forwards == self.descending:
+            return f'-{self.field}', '-pk'
+        return self.field, 'pk'
+
+    def _seek(self, cursor, forwards):
+        value, pk = self.decode_cursor(cursor)
+        # Filtered as a range on the field so the index can be scanned, ties are broken by id
+        if forwards == self.descending:
+            return self.queryset.filter(**{f'{self.field}__lte': value}).exclude(**{self.field: value, 'pk__gte': pk})
+        return self.queryset.filter(**{f'{self.field}__gte': value}).exclude(**{self.field: value, 'pk__lte': pk})
+
+    def _page_queryset(self, after, before):
+        # Fetch one extra row to tell whether there is another page in the direction read
+        if before:
+            # Read backwards from the cursor, the page is put back in display order once fetched
+            return self._seek(before, forwards=False).order_by(*self._order(False))[:self.per_page + 1]
+        queryset = self._seek(after, forwards=True) if after else self.queryset
+        return queryset.order_by(*self._order(True))[:self.per_page + 1]
+
+    def _build_page(self, rows, after, before):
+        if before:
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next = True
+        else:
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = bool(after)
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1]) if has_next and rows else None,
+            previous_cursor=self.encode_cursor(rows[0]) if has_previous and rows else None,
+        )
+
+    def get_page(self, after=None, before=None):
+        """
+        Get the page following the after cursor, preceding the before cursor or the first page if neither is given.
+
+        Returns
+        -------
+        KeysetPage
+        """
+        return self._build_page(list(self._page_queryset(after, before)), after, before)
+
+    async def aget_page(self, after=None, before=None):
+        """
+        Async version of get_page using the async ORM.
+
+        Returns
+        -------
+        KeysetPage
+        """
+        rows = [row async for row in self._page_queryset(after, before)]
+        return self._build_page(rows, after, before)
+
+
+async def apaginate(queryset, per_page, number):
+    """
+    Get a numbered page of a queryset with the async ORM, the counterpart of Paginator.page for async views.
+
+    Parameters
+    ----------
+    queryset : QuerySet
+        ordered queryset to paginate
+    per_page : int
+        number of objects per page
+    number : str
+        page number from the request, or 'last'
+
+    Returns
+    -------
+    Page with the rows of the page fetched
+    """
+    # Paginator only needs the count to validate the page number, the rows are sliced separately
+    paginator = Paginator([], per_page)
+    paginator.count = await queryset.acount()
+    try:
+        number = paginator.num_pages if number == 'last' else paginator.validate_number(number)
+    except InvalidPage as e:
+        raise Http404(f'Invalid page ({number}): {e}')
+    bottom = (number - 1) * per_page
+    rows = [row async for row in queryset[bottom:bottom + per_page]]
+    return Page(rows, number, paginator)
@@ -0,0 +1,216 @@
+import difflib
+import json
+import zlib
+
+from django.db.models import Max, OuterRef, Subquery
+
+from .models import ArticleRevision
+
+# A full copy of the content is stored at least every SNAPSHOT_INTERVAL revisions,
+# so reading a revision never applies more than SNAPSHOT_INTERVAL - 1 deltas
+SNAPSHOT_INTERVAL = 20
+
+
+def compress_snapshot(content):
+    """
+    Compress the full content of an article.
+
+    Parameters
+    ----------
+    content : str
+        article content
+
+    Returns
+    -------
+    bytes of compressed content
+    """
+    return zlib.compress(content.encode('utf-8'))
+
+
+def compress_delta(old, new):
+    """
+    Compress the line changes needed to turn old content into new content.
+    The delta is a JSON list where a pair of integers copies a range of lines from the old content
+    and a string inserts new text, so unchanged lines cost a few bytes however long they are.
+
+    Parameters
+    ----------
+    old : str
+        content of the previous revision
+    new : str
+        content of the new revision
+
+    Returns
+    -------
+    bytes of compressed delta
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    operations = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            operations.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            operations.append(''.join(new_lines[j1:j2]))
+    return zlib.compress(json.dumps(operations, separators=(',', ':')).encode('utf-8'))
+
+
+def apply_delta(old, data):
+    """
+    Rebuild the content of a revision from the previous content and its compressed delta.
+
+    Parameters
+    ----------
+    old : str
+        content of the previous revision
+    data : bytes
+        compressed delta from compress_delta
+
+    Returns
+    -------
+    str of the new content
+    """
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    for operation in json.loads(zlib.decompress(data)):
+        if isinstance(operation, str):
+            parts.append(operation)
+        else:
+            parts.extend(old_lines[operation[0]:operation[1]])
+    return ''.join(parts)
+
+
+def _rebuild(revision):
+    """
+    Rebuild the content of a revision from the latest snapshot at or before it.
+    The snapshot and the deltas after it are fetched in one query.
+
+    Returns
+    -------
+    tuple of the content and the number of the snapshot it was rebuilt from
+    """
+    model = type(revision)
+    snapshot = (
+        model.objects.filter(article_id=OuterRef('article_id'), number__lte=revision.number, is_snapshot=True)
+        .order_by('-number').values('number')[:1]
+    )
+    chain = (
+        model.objects.filter(article_id=revision.article_id, number__lte=revision.number,
+                             number__gte=Subquery(snapshot))
+        .order_by('number').values_list('number', 'is_snapshot', 'data')
+    )
+    content, snapshot_number = '', None
+    for number, is_snapshot, data in chain:
+        if is_snapshot:
+            content, snapshot_number = zlib.decompress(data).decode('utf-8'), number
+        else:
+            content = apply_delta(content, data)
+    return content, snapshot_number
+
+
+def get_revision_content(revision):
+    """
+    Rebuild the content of a revision, applying at most SNAPSHOT_INTERVAL - 1 deltas.
+
+    Parameters
+    ----------
+    revision : ArticleRevision
+        revision to read
+
+    Returns
+    -------
+    str of the content of the revision
+    """
+    return _rebuild(revision)[0]
+
+
+def record_revision(article, user=None):
+    """
+    Store the current title and content of an article as a new revision, unless neither has changed.
+    Content is stored as a delta against the previous revision, or as a snapshot when there is no
+    previous revision, the last snapshot is SNAPSHOT_INTERVAL revisions old or the delta would be larger.
+
+    Parameters
+    ----------
+    article : Article
+        saved article
+    user : User
+        author of the revision (default is the article's modified_by)
+
+    Returns
+    -------
+    ArticleRevision created, or None if nothing changed
+    """
+    previous = article.revisions.defer('data').order_by('-number').first()
+    revision = ArticleRevision(
+        article=article,
+        number=1,
+        title=article.title,
+        created_by_id=user.pk if user else article.modified_by_id,
+        is_snapshot=True,
+        data=compress_snapshot(article.content),
+    )
+    if previous is not None:
+        previous_content, last_snapshot = _rebuild(previous)
+        if previous_content == article.content and previous.title == article.title:
+            return None
+        revision.number = previous.number + 1
+        if revision.number - last_snapshot < SNAPSHOT_INTERVAL:
+            delta = compress_delta(previous_content, article.content)
+            if len(delta) < len(revision.data):
+                revision.is_snapshot = False
+                revision.data = delta
+    revision.save()
+    return revision
+
+
+def snapshot_revisions(articles, batch_size=500):
+    """
+    Store the current title and content of many articles as snapshot revisions with bulk inserts.
+    Used by bulk writes which skip the signal that records revisions.
+
+    Parameters
+    ----------
+    articles : list
+        saved articles
+    batch_size : int
+        number of rows to insert per query
+    """
+    numbers = dict(
+        ArticleRevision.objects.filter(article__in=[article.pk for article in articles])
+        .values('article_id').annotate(number=Max('number')).values_list('article_id', 'number')
+    )
+    ArticleRevision.objects.bulk_create(
+        [ArticleRevision(
+            article_id=article.pk,
+            number=numbers.get(article.pk, 0) + 1,
+            title=article.title,
+            created_by_id=article.modified_by_id,
+            is_snapshot=True,
+            data=compress_snapshot(article.content),
+        ) for article in articles],
+        batch_size=batch_size,
+    )
+
+
+def diff_lines(old, new, context=3):
+    """
+    Compare two versions of article content line by line for display.
+
+    Parameters
+    ----------
+    old : str
+        previous content
+    new : str
+        new content
+    context : int
+        number of unchanged lines shown around each change
+
+    Returns
+    -------
+    list of (kind, line) tuples where kind is 'added', 'removed', 'unchanged' or 'range'
+    """
+    kinds = {'+': 'added', '-': 'removed', ' ': 'unchanged', '@': 'range'}
+    lines = difflib.unified_diff(old.splitlines(), new.splitlines(), n=context, lineterm='')
+    # Skip the file name header lines
+    return [(kinds[line[0]], line if line.startswith('@@') else line[1:]) for line in list(lines)[2:]]
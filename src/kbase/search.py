@@ -0,0 +1,188 @@
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchHeadline, SearchVector, TrigramWordSimilarity
+)
+from django.db import connections, router
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+# Text search configuration used by Postgres for stemming and stop words
+SEARCH_CONFIG = 'english'
+# FTS5 table used when running on SQLite
+SQLITE_FTS_TABLE = 'kbase_article_fts'
+# Markers wrapped around matched terms in snippets, replaced with HTML by the highlight template filter.
+# Control characters are used so they can never clash with article content.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+# Shortest input autocomplete will search for, trigram matching is meaningless below this
+AUTOCOMPLETE_MIN_LENGTH = 2
+
+
+def _vendor(model, write=False):
+    alias = router.db_for_write(model) if write else router.db_for_read(model)
+    return connections[alias].vendor, alias
+
+
+def _fts5_query(search_query):
+    """
+    Convert free text into an FTS5 query where every word must match.
+    Words are quoted so user input can't use FTS5 query syntax.
+    """
+    words = re.findall(r'\w+', search_query)
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def _fts5_prefix_query(search_query, column):
+    """
+    Convert free text into an FTS5 query matching words in a single column, the last word as a prefix.
+    """
+    words = re.findall(r'\w+', search_query)
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*']
+    return f'{column} : ({" ".join(terms)})'
+
+
+def update_search_index(model, pks):
+    """
+    Update the search index for the given articles. Called when articles are saved.
+
+    Parameters
+    ----------
+    model : class
+        the Article model
+    pks : iterable
+        ids of the articles to update
+    """
+    pks = list(pks)
+    vendor, alias = _vendor(model, write=True)
+    if vendor == 'postgresql':
+        model.objects.using(alias).filter(pk__in=pks).update(
+            search_vector=(
+                SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+                SearchVector('content', weight='B', config=SEARCH_CONFIG)
+            )
+        )
+    elif vendor == 'sqlite':
+        placeholders = ', '.join(['%s'] * len(pks))
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid IN ({placeholders})', pks)
+            cursor.execute(
+                f'INSERT INTO {SQLITE_FTS_TABLE} (rowid, title, content) '
+                f'SELECT id, title, content FROM {model._meta.db_table} WHERE id IN ({placeholders})',
+                pks
+            )
+
+
+def remove_from_search_index(model, pks):
+    """
+    Remove deleted articles from the search index.
+    Postgres stores the search vector on the article row so nothing needs doing there.
+    """
+    pks = list(pks)
+    vendor, alias = _vendor(model, write=True)
+    if vendor == 'sqlite':
+        placeholders = ', '.join(['%s'] * len(pks))
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid IN ({placeholders})', pks)
+
+
+def search_articles(queryset, search_query):
+    """
+    Full text search articles, ranked by relevance with title matches weighted above content matches.
+
+    Uses the Postgres search vector and GIN index in production and an FTS5 table on SQLite. Other databases
+    fall back to a case-insensitive substring search.
+
+    Parameters
+    ----------
+    queryset : QuerySet
+        articles to search, eg. already filtered by permission
+    search_query : str
+        free text search entered by the user
+
+    Returns
+    -------
+    QuerySet ordered by relevance, annotated with rank and a snippet of content with matches highlighted
+    """
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        query = SearchQuery(search_query, search_type='websearch', config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query),
+            snippet=SearchHeadline(
+                'content', query, config=SEARCH_CONFIG,
+                start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP,
+                max_words=35, min_words=15,
+            ),
+        ).order_by('-rank', '-modified_date')
+
+    if vendor == 'sqlite':
+        query = _fts5_query(search_query)
+        if not query:
+            return queryset.none()
+        table = queryset.model._meta.db_table
+        match = f'FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s'
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid {match}', [query])
+        ).annotate(
+            # bm25 scores are lower for better matches, negate so rank sorts the same as Postgres
+            rank=RawSQL(f'SELECT -bm25({SQLITE_FTS_TABLE}, 10.0, 1.0) {match} AND rowid = "{table}"."id"', [query]),
+            snippet=RawSQL(
+                f"SELECT snippet({SQLITE_FTS_TABLE}, 1, %s, %s, '…', 24) {match} AND rowid = \"{table}\".\"id\"",
+                [HIGHLIGHT_START, HIGHLIGHT_STOP, query]
+            ),
+        ).order_by('-rank', '-modified_date')
+
+    return queryset.filter(
+        Q(title__icontains=search_query) |
+        Q(content__icontains=search_query)
+    )
+
+
+def autocomplete_titles(queryset, search_query, limit):
+    """
+    Find the articles whose titles best match partially typed text, for search-as-you-type.
+
+    Uses pg_trgm word similarity backed by a GIN trigram index on Postgres and a prefix query on the FTS5 table
+    on SQLite. Other databases fall back to a case-insensitive prefix match.
+
+    Parameters
+    ----------
+    queryset : QuerySet
+        articles to search, eg. already filtered by permission
+    search_query : str
+        text typed so far
+    limit : int
+        maximum number of articles to return
+
+    Returns
+    -------
+    QuerySet of at most limit articles, best match first
+    """
+    search_query = search_query.strip()
+    if len(search_query) < AUTOCOMPLETE_MIN_LENGTH:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        return queryset.filter(title__trigram_word_similar=search_query).annotate(
+            similarity=TrigramWordSimilarity(search_query, 'title'),
+        ).order_by('-similarity', 'title')[:limit]
+
+    if vendor == 'sqlite':
+        query = _fts5_prefix_query(search_query, 'title')
+        if not query:
+            return queryset.none()
+        table = queryset.model._meta.db_table
+        match = f'FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s'
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid {match}', [query])
+        ).annotate(
+            similarity=RawSQL(f'SELECT -bm25({SQLITE_FTS_TABLE}) {match} AND rowid = "{table}"."id"', [query]),
+        ).order_by('-similarity', 'title')[:limit]
+
+    return queryset.filter(title__istartswith=search_query).order_by('title')[:limit]
@@ -0,0 +1,133 @@
+from django.core.cache import cache
+from django.db.models.signals import pre_save, post_save, m2m_changed, pre_delete, post_delete
+from django.dispatch import receiver
+
+from authentication.models import Group
+from .access import rebuild_article_access
+from .models import Article
+from .revisions import record_revision
+from .search import update_search_index, remove_from_search_index
+
+
+@receiver(pre_save, sender=Article)
+def store_creator_change_on_article_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Remember whether an existing article's creator is changing, other fields do not affect access.
+    """
+    if raw or instance._state.adding or (update_fields is not None and 'created_by' not in update_fields):
+        return
+    instance._creator_changed = (
+        sender.objects.filter(pk=instance.pk).exclude(created_by_id=instance.created_by_id).exists()
+    )
+
+
+@receiver(post_save, sender=Article)
+def update_access_on_article_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Rebuild access for a new article or a changed creator, so edits do not rewrite the access of every group member.
+    """
+    if raw:
+        return
+    if created or instance.__dict__.pop('_creator_changed', False):
+        rebuild_article_access(articles=[instance.pk])
+
+
+@receiver(post_save, sender=Article)
+def update_search_index_on_article_save(sender, instance, raw=False, **kwargs):
+    """
+    Re-index a saved article for full text search.
+    """
+    if raw:
+        return
+    update_search_index(sender, [instance.pk])
+
+
+@receiver(post_save, sender=Article)
+def record_revision_on_article_save(sender, instance, raw=False, **kwargs):
+    """
+    Record a revision when an article's title or content changes.
+    """
+    if raw:
+        return
+    record_revision(instance)
+
+
+@receiver(post_delete, sender=Article)
+def update_search_index_on_article_delete(sender, instance, **kwargs):
+    """
+    Remove a deleted article from the full text search index.
+    """
+    remove_from_search_index(sender, [instance.pk])
+
+
+@receiver(pre_save, sender=Article)
+def clear_content_cache_on_article_save(sender, instance, raw=False, **kwargs):
+    """
+    Remove the cached rendered content of an article before it is saved with a new modified date.
+    """
+    if instance.pk and instance.modified_date and not raw:
+        cache.delete(instance.content_cache_key)
+
+
+@receiver(post_delete, sender=Article)
+def clear_content_cache_on_article_delete(sender, instance, **kwargs):
+    """
+    Remove the cached rendered content of a deleted article.
+    """
+    cache.delete(instance.content_cache_key)
+
+
+@receiver(m2m_changed, sender=Article.groups_with_view.through)
+@receiver(m2m_changed, sender=Article.groups_with_edit.through)
+def update_access_on_article_groups_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Rebuild access when groups are added to or removed from an article's view or edit permissions.
+    """
+    if not reverse:
+        # Groups changed from the article side
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            rebuild_article_access(articles=[instance.pk])
+    elif action == 'pre_clear':
+        # Remember the articles before they are cleared from the group side
+        instance._cleared_article_ids = list(
+            sender.objects.filter(group_id=instance.pk).values_list('article_id', flat=True)
+        )
+    elif action == 'post_clear':
+        rebuild_article_access(articles=instance.__dict__.pop('_cleared_article_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        # Articles added or removed from the group side
+        rebuild_article_access(articles=pk_set)
+
+
+@receiver(m2m_changed, sender=Group.users.through)
+def update_access_on_group_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Rebuild access for users joining or leaving a group.
+    """
+    if reverse:
+        # Groups changed from the user side
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            rebuild_article_access(users=[instance.pk])
+    elif action == 'pre_clear':
+        # Remember the members before they are removed
+        instance._cleared_user_ids = list(instance.users.values_list('id', flat=True))
+    elif action == 'post_clear':
+        rebuild_article_access(users=instance.__dict__.pop('_cleared_user_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        rebuild_article_access(users=pk_set)
+
+
+@receiver(pre_delete, sender=Group)
+def store_members_on_group_delete(sender, instance, **kwargs):
+    """
+    Remember a group's members before it is deleted, the membership rows are removed without m2m signals.
+    """
+    instance._deleted_user_ids = list(instance.users.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def update_access_on_group_delete(sender, instance, **kwargs):
+    """
+    Rebuild access for the members of a deleted group.
+    """
+    rebuild_article_access(users=instance.__dict__.pop('_deleted_user_ids', []))
@@ -1,8 +1,18 @@
 from django import template
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from kbase.search import HIGHLIGHT_START, HIGHLIGHT_STOP
 
 register = template.Library()
 
 @register.filter(name='add_class')
 def add_class(value, arg):
     """Add a class to a form field widget."""
-    return value.as_widget(attrs={'class': arg})
\ No newline at end of file
+    return value.as_widget(attrs={'class': arg})
+
+@register.filter(name='highlight')
+def highlight(value):
+    """Escape a search snippet and wrap the matched terms in mark tags."""
+    value = escape(value).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+    return mark_safe(value)
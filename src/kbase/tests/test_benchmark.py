@@ -0,0 +1,33 @@
+import json
+
+from django.test import TestCase
+
+from kbase.benchmark import run_benchmarks, measure_middleware
+
+
+class BenchmarkTestCase(TestCase):
+    def test_run_benchmarks(self):
+        scenarios = ['dashboard', 'dashboard_next_page', 'article', 'search', 'autocomplete', 'admin_users', 'admin_groups']
+        results = run_benchmarks(users=3, groups=2, articles=30, repeat=1, scenarios=scenarios)
+
+        # Results should be serialisable for comparing across commits
+        json.dumps(results)
+        self.assertEqual(len(results['runs']), 2)
+        self.assertEqual(results['runs'][1]['data'], {'users': 6, 'groups': 4, 'articles': 60})
+        for run in results['runs']:
+            self.assertEqual(set(run['results']), set(scenarios))
+            for result in run['results'].values():
+                self.assertEqual(result['status'], 200)
+
+        # These views should not run more queries as the data grows
+        for scenario in scenarios:
+            self.assertEqual(results['query_growth'][scenario], 0, scenario)
+
+        # Middleware is only measured when asked for
+        self.assertNotIn('middleware', results)
+
+    def test_measure_middleware(self):
+        results = measure_middleware(repeat=2, loops=10)
+        self.assertEqual(set(results), {'verified', 'unverified', 'anonymous'})
+        for result in results.values():
+            self.assertGreater(result['time_us']['median'], 0)
@@ -0,0 +1,136 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.crypto import get_random_string
+from authentication.models import User, Group
+from kbase.models import Article, ArticleAccess
+from kbase.search import search_articles
+
+# Generate a random user password for test accounts
+TEST_USER_PASSWORD = get_random_string(length=24)
+
+
+class ImportExportArticlesTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = str(Path(self.directory.name) / 'articles.jsonl')
+
+        self.user1 = User.objects.create_user(
+            email='testuser1@example.com',
+            first_name='One',
+            last_name='User',
+            password=TEST_USER_PASSWORD
+        )
+        self.user2 = User.objects.create_user(
+            email='testuser2@example.com',
+            first_name='Two',
+            last_name='User',
+            password=TEST_USER_PASSWORD
+        )
+        self.group = Group.objects.create(name='support')
+        self.group.users.add(self.user2)
+
+    def write(self, rows):
+        with open(self.path, 'w') as file:
+            for row in rows:
+                file.write((row if isinstance(row, str) else json.dumps(row)) + '\n')
+
+    def import_articles(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_articles', self.path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_export_articles(self):
+        # Test articles are exported with their authors and group permissions
+        article = Article.objects.create(title='Exported Article', content='Content', created_by=self.user1,
+                                         modified_by=self.user2)
+        article.groups_with_view.add(self.group, 1)
+        Article.objects.create(title='Second Article', content='Content')
+
+        out, err = StringIO(), StringIO()
+        with self.assertNumQueries(3):
+            # Articles, then the view groups and edit groups for the chunk
+            call_command('export_articles', chunk_size=10, stdout=out, stderr=err)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['title'], 'Exported Article')
+        self.assertEqual(rows[0]['created_by'], self.user1.email)
+        self.assertEqual(rows[0]['modified_by'], self.user2.email)
+        self.assertEqual(rows[0]['groups_with_view'], ['all users', 'support'])
+        self.assertEqual(rows[0]['groups_with_edit'], [])
+        self.assertIsNone(rows[1]['created_by'])
+        self.assertIn('Exported 2 articles.', err.getvalue())
+
+    def test_export_and_import(self):
+        # Test an export can be imported into an empty database
+        article = Article.objects.create(title='Round Trip', content='Failover runbook', created_by=self.user1)
+        article.groups_with_edit.add(self.group)
+        call_command('export_articles', output=self.path, stderr=StringIO())
+        created_date = Article.objects.get().created_date
+        Article.objects.all().delete()
+
+        out, err = self.import_articles()
+        self.assertIn('Created 1 articles, updated 0, skipped 0.', out)
+        article = Article.objects.get()
+        self.assertEqual(article.slug, 'round-trip')
+        self.assertEqual(article.created_by, self.user1)
+        self.assertEqual(article.created_date, created_date)
+        self.assertEqual(list(article.groups_with_edit.all()), [self.group])
+
+        # Access and search are updated for imported articles
+        self.assertEqual(ArticleAccess.objects.get(user=self.user2, article=article).level, 'edit')
+        self.assertEqual(article.get_permissions(self.user1), 'edit')
+        self.assertIn(article, search_articles(Article.objects.all(), 'failover'))
+
+    def test_import_conflicts(self):
+        # Test existing titles are skipped, or replaced with --update
+        article = Article.objects.create(title='Existing Article', content='Old content')
+        cache.set(article.content_cache_key, 'Old content')
+        self.write([
+            {'title': 'existing article', 'content': 'New content', 'groups_with_view': ['support'],
+             'modified_date': article.modified_date.isoformat()},
+            {'title': 'New Article', 'content': 'Content'},
+        ])
+        out, err = self.import_articles()
+        self.assertIn('Created 1 articles, updated 0, skipped 1.', out)
+        self.assertIn('Line 1: an article titled existing article already exists', err)
+
+        Article.objects.filter(title='New Article').delete()
+        out, err = self.import_articles('--update')
+        self.assertIn('Created 1 articles, updated 1, skipped 0.', out)
+        article.refresh_from_db()
+        self.assertEqual(article.title, 'existing article')
+        self.assertEqual(article.content, 'New content')
+        self.assertEqual(list(article.groups_with_view.all()), [self.group])
+        self.assertEqual(article.get_permissions(self.user2), 'view')
+        self.assertEqual(article.rendered_content, '<p>New content</p>')
+
+    def test_import_skips_invalid_lines(self):
+        # Test invalid lines are reported and skipped
+        self.write([
+            'not json',
+            {'title': 'Bad <title>', 'content': 'Content'},
+            {'title': 'No Content'},
+            {'title': 'New', 'content': 'Content'},
+            {'title': 'Unknown Groups', 'content': 'Content', 'groups_with_edit': ['missing']},
+            {'title': 'Valid', 'content': 'Content'},
+            {'title': 'valid', 'content': 'Content'},
+        ])
+        out, err = self.import_articles('--batch-size', '2')
+        self.assertIn('Created 1 articles, updated 0, skipped 6.', out)
+        for line, message in ((1, 'invalid JSON'), (2, 'title'), (3, 'content'), (4, 'reserved'),
+                              (5, 'unknown groups missing'), (7, 'appears more than once')):
+            self.assertIn(f'Line {line}: ', err)
+            self.assertIn(message, err)
+
+        # Unknown groups can be created
+        self.write([{'title': 'Unknown Groups', 'content': 'Content', 'groups_with_edit': ['Missing']}])
+        self.import_articles('--create-groups')
+        self.assertEqual(list(Article.objects.get(title='Unknown Groups').groups_with_edit.all()),
+                         [Group.objects.get(name='missing')])
@@ -1,9 +1,14 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils.text import slugify
 from django.utils import timezone
-from authentication.models import User, Group
+from authentication.models import User, Group, ALL_USERS_GROUP_ID
 from django.core.exceptions import ValidationError
-from kbase.models import Article
+from kbase.models import Article, ArticleAccess
+from django.core.management import call_command
+from django.core.cache import cache
+from io import StringIO
 from django.utils.crypto import get_random_string
 
 # Generate a random user password for test accounts
@@ -85,3 +90,184 @@ class ArticleModelTestCase(TestCase):
             created_by=self.user1,
         )
         self.assertRaises(ValidationError, article.full_clean)
+
+    def test_visible_to(self):
+        # user1 should only see the article they created
+        self.assertQuerySetEqual(Article.objects.visible_to(self.user1), [self.test_article1])
+
+        # Group membership should grant view access
+        self.group2.users.add(self.user1)
+        self.assertQuerySetEqual(
+            Article.objects.visible_to(self.user1).order_by('id'),
+            [self.test_article1, self.test_article2]
+        )
+
+    def test_visible_to_admin(self):
+        # Admins should see every article
+        self.user1.is_admin = True
+        self.user1.save()
+        self.assertEqual(Article.objects.visible_to(self.user1).count(), 2)
+
+    def test_editable_by(self):
+        # View permission should not grant edit
+        self.group2.users.add(self.user1)
+        self.assertQuerySetEqual(Article.objects.editable_by(self.user1), [self.test_article1])
+
+        # Edit groups should grant edit
+        self.test_article2.groups_with_edit.set([self.group2.id])
+        self.assertQuerySetEqual(
+            Article.objects.editable_by(self.user1).order_by('id'),
+            [self.test_article1, self.test_article2]
+        )
+
+    def test_visible_to_matches_get_permissions(self):
+        # The queryset filter should agree with the per-article permission check
+        self.group1.users.add(self.user1)
+        self.test_article2.groups_with_edit.set([self.group1.id])
+        for user in (self.user1, self.user2):
+            expected = {
+                article.id for article in Article.objects.all()
+                if article.get_permissions(user) in ('view', 'edit')
+            }
+            self.assertEqual(set(Article.objects.visible_to(user).values_list('id', flat=True)), expected)
+
+    def test_get_permissions_single_query(self):
+        self.group2.users.add(self.user1)
+        user = User.objects.get(pk=self.user1.pk)
+        # Group permissions are resolved from ArticleAccess in one lookup
+        with self.assertNumQueries(1):
+            self.assertEqual(self.test_article2.get_permissions(user), 'view')
+        # The creator needs no lookup
+        with self.assertNumQueries(0):
+            self.assertEqual(self.test_article1.get_permissions(user), 'edit')
+
+    def test_access_follows_group_changes(self):
+        # Joining a group grants access
+        self.group2.users.add(self.user1)
+        self.assertTrue(ArticleAccess.objects.filter(user=self.user1, article=self.test_article2, level='view').exists())
+
+        # Edit permission upgrades the access level
+        self.test_article2.groups_with_edit.add(self.group2)
+        self.assertEqual(ArticleAccess.objects.get(user=self.user1, article=self.test_article2).level, 'edit')
+
+        # Leaving the group revokes access
+        self.user1.groups.remove(self.group2)
+        self.assertFalse(ArticleAccess.objects.filter(user=self.user1, article=self.test_article2).exists())
+
+        # Deleting a group revokes access
+        self.group2.users.add(self.user1)
+        self.group2.delete()
+        self.assertFalse(ArticleAccess.objects.filter(user=self.user1, article=self.test_article2).exists())
+
+    def test_all_users_group(self):
+        # Sharing with 'All Users' grants every user access without storing access rows
+        self.test_article2.groups_with_view.add(ALL_USERS_GROUP_ID)
+        self.test_article2.refresh_from_db()
+        self.assertEqual(self.test_article2.all_users_level, 'view')
+        self.assertFalse(ArticleAccess.objects.filter(user=self.user1, article=self.test_article2).exists())
+        self.assertEqual(self.test_article2.get_permissions(self.user1), 'view')
+        self.assertIn(self.test_article2, Article.objects.visible_to(self.user1))
+        self.assertNotIn(self.test_article2, Article.objects.editable_by(self.user1))
+
+        # Edit permission for 'All Users' needs no lookup
+        self.test_article2.groups_with_edit.add(ALL_USERS_GROUP_ID)
+        self.test_article2.refresh_from_db()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.test_article2.get_permissions(self.user1), 'edit')
+        self.assertIn(self.test_article2, Article.objects.editable_by(self.user1))
+
+        # A group can still give more than 'All Users'
+        self.test_article2.groups_with_edit.remove(ALL_USERS_GROUP_ID)
+        self.test_article2.groups_with_edit.add(self.group1)
+        self.group1.users.add(self.user1)
+        self.test_article2.refresh_from_db()
+        self.assertEqual(self.test_article2.get_permissions(self.user1), 'edit')
+
+        # Clearing the articles from the group side removes access
+        Group.objects.get(pk=ALL_USERS_GROUP_ID).groups_view_articles.clear()
+        self.test_article2.refresh_from_db()
+        self.assertIsNone(self.test_article2.all_users_level)
+        self.group1.users.remove(self.user1)
+        self.assertNotIn(self.test_article2, Article.objects.visible_to(self.user1))
+
+    def test_visible_to_has_no_duplicates(self):
+        # Articles shared with 'All Users' and with a user's group are only listed once
+        self.test_article2.groups_with_view.add(ALL_USERS_GROUP_ID)
+        self.group2.users.add(self.user1)
+        self.assertEqual(Article.objects.visible_to(self.user1).filter(pk=self.test_article2.pk).count(), 1)
+
+    def test_rebuild_article_access_command(self):
+        self.group2.users.add(self.user1)
+        expected = set(ArticleAccess.objects.values_list('user_id', 'article_id', 'level'))
+        ArticleAccess.objects.all().delete()
+
+        call_command('rebuild_article_access', batch_size=1, stdout=StringIO())
+        self.assertEqual(set(ArticleAccess.objects.values_list('user_id', 'article_id', 'level')), expected)
+
+    def test_article_save_only_rebuilds_access_for_new_creator(self):
+        # Editing an article leaves access alone, changing its creator moves the creator's edit access
+        self.group2.users.add(self.user1)
+        with CaptureQueriesContext(connection) as queries:
+            self.test_article2.content = 'Edited content'
+            self.test_article2.save()
+        self.assertFalse([query for query in queries if 'kbase_articleaccess' in query['sql']])
+
+        self.test_article2.created_by = self.user1
+        self.test_article2.save()
+        self.assertEqual(ArticleAccess.objects.get(user=self.user1, article=self.test_article2).level, 'edit')
+
+    def test_rebuild_article_access_skips_all_users_members(self):
+        # Membership rows left in 'All Users' from before it was virtual never become access rows
+        self.test_article2.groups_with_view.add(ALL_USERS_GROUP_ID)
+        Group.users.through.objects.create(group_id=ALL_USERS_GROUP_ID, user=self.user1)
+
+        call_command('rebuild_article_access', stdout=StringIO())
+        self.assertFalse(ArticleAccess.objects.filter(user=self.user1, article=self.test_article2).exists())
+        self.test_article2.refresh_from_db()
+        self.assertEqual(self.test_article2.all_users_level, 'view')
+
+    def test_rendered_content(self):
+        self.test_article1.content = 'First line\n\nSecond <line>'
+        self.test_article1.save()
+        html = '<p>First line</p>\n\n<p>Second &lt;line&gt;</p>'
+        self.assertEqual(self.test_article1.rendered_content, html)
+        self.assertEqual(cache.get(self.test_article1.content_cache_key), html)
+
+    def test_rendered_content_invalidated_on_save_and_delete(self):
+        old_key = self.test_article1.content_cache_key
+        self.test_article1.rendered_content
+        self.test_article1.content = 'Updated content'
+        self.test_article1.save()
+
+        # The old rendering is removed and the new content is rendered
+        self.assertIsNone(cache.get(old_key))
+        self.assertEqual(self.test_article1.rendered_content, '<p>Updated content</p>')
+
+        key = self.test_article1.content_cache_key
+        self.test_article1.delete()
+        self.assertIsNone(cache.get(key))
+
+    def test_version_incremented_on_save(self):
+        # test_article1 was saved once after it was created
+        self.assertEqual(self.test_article1.version, 2)
+        self.test_article1.save()
+        self.test_article1.refresh_from_db()
+        self.assertEqual(self.test_article1.version, 3)
+
+    def test_save_if_unchanged(self):
+        # Two editors load the same version of the article
+        first = Article.objects.get(pk=self.test_article1.pk)
+        second = Article.objects.get(pk=self.test_article1.pk)
+        version = first.version
+
+        first.content = 'First edit'
+        self.assertTrue(first.save_if_unchanged(version))
+        self.assertEqual(first.version, version + 1)
+
+        # The second save is based on an old version so is rejected without writing
+        second.content = 'Second edit'
+        self.assertFalse(second.save_if_unchanged(version))
+        self.test_article1.refresh_from_db()
+        self.assertEqual(self.test_article1.content, 'First edit')
+        self.assertEqual(self.test_article1.version, version + 1)
+
@@ -0,0 +1,102 @@
+from django.test import TestCase
+from django.utils.crypto import get_random_string
+from authentication.models import User
+from kbase.models import Article, ArticleRevision
+from kbase.revisions import (SNAPSHOT_INTERVAL, compress_delta, apply_delta, get_revision_content, diff_lines,
+                             snapshot_revisions)
+
+# Generate a random user password for test accounts
+TEST_USER_PASSWORD = get_random_string(length=24)
+
+
+class RevisionsTestCase(TestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(
+            email='testuser1@example.com',
+            first_name='One',
+            last_name='User',
+            password=TEST_USER_PASSWORD
+        )
+        self.user2 = User.objects.create_user(
+            email='testuser2@example.com',
+            first_name='Two',
+            last_name='User',
+            password=TEST_USER_PASSWORD
+        )
+        self.content = '\n'.join(f'Step {i}: restart the service on node {i}' for i in range(200))
+        self.article = Article.objects.create(title='Runbook', content=self.content, created_by=self.user1,
+                                              modified_by=self.user1)
+
+    def edit(self, content, user=None):
+        self.article.content = content
+        self.article.modified_by = user or self.user1
+        self.article.save()
+
+    def test_delta_round_trip(self):
+        # Test deltas rebuild the new content, including line endings and unicode
+        old = 'First line\r\nSecond line\n\nThird line'
+        for new in ('First line\r\nChanged line\n\nThird line\n', '', 'Ünïcödé\n' + old, old + '\nend'):
+            self.assertEqual(apply_delta(old, compress_delta(old, new)), new)
+
+    def test_first_revision_is_snapshot(self):
+        # Test creating an article records a snapshot with the author
+        revision = self.article.revisions.get()
+        self.assertEqual(revision.number, 1)
+        self.assertTrue(revision.is_snapshot)
+        self.assertEqual(revision.created_by, self.user1)
+        self.assertEqual(revision.title, 'Runbook')
+        self.assertEqual(get_revision_content(revision), self.content)
+
+    def test_edit_records_delta(self):
+        # Test a small edit is stored as a delta much smaller than the content
+        self.edit(self.content.replace('node 100', 'node 100 and check the logs'), self.user2)
+        revision = self.article.revisions.get(number=2)
+        self.assertFalse(revision.is_snapshot)
+        self.assertEqual(revision.created_by, self.user2)
+        self.assertLess(len(revision.data), len(self.article.revisions.get(number=1).data) / 10)
+        self.assertEqual(get_revision_content(revision), self.article.content)
+        self.assertEqual(get_revision_content(self.article.revisions.get(number=1)), self.content)
+
+    def test_unchanged_save_records_nothing(self):
+        # Test saves which don't change the title or content, such as permission changes, are not recorded
+        self.article.save()
+        self.assertEqual(self.article.revisions.count(), 1)
+
+        self.article.title = 'Renamed Runbook'
+        self.article.save()
+        self.assertEqual(self.article.revisions.latest('number').title, 'Renamed Runbook')
+
+    def test_periodic_snapshots(self):
+        # Test a snapshot is stored every SNAPSHOT_INTERVAL revisions and every revision can be rebuilt
+        contents = [self.content]
+        for i in range(SNAPSHOT_INTERVAL + 5):
+            contents.append(contents[-1] + f'\nStep {200 + i}: verify')
+            self.edit(contents[-1])
+
+        snapshots = list(self.article.revisions.filter(is_snapshot=True).values_list('number', flat=True))
+        self.assertEqual(snapshots, [1, SNAPSHOT_INTERVAL + 1])
+        for revision in self.article.revisions.all():
+            self.assertEqual(get_revision_content(revision), contents[revision.number - 1])
+
+        # Reading any revision is a single query
+        revision = self.article.revisions.latest('number')
+        with self.assertNumQueries(1):
+            get_revision_content(revision)
+
+    def test_snapshot_revisions(self):
+        # Test bulk snapshots continue the numbering
+        self.article.content = 'Replaced'
+        snapshot_revisions([self.article])
+        revision = self.article.revisions.latest('number')
+        self.assertEqual(revision.number, 2)
+        self.assertEqual(get_revision_content(revision), 'Replaced')
+
+    def test_revisions_deleted_with_article(self):
+        self.article.delete()
+        self.assertFalse(ArticleRevision.objects.exists())
+
+    def test_diff_lines(self):
+        diff = diff_lines('one\ntwo\nthree', 'one\n2\nthree')
+        self.assertEqual(diff, [('range', '@@ -1,3 +1,3 @@'), ('unchanged', 'one'), ('removed', 'two'),
+                                ('added', '2'), ('unchanged', 'three')])
+        self.assertEqual(diff_lines('same', 'same'), [])
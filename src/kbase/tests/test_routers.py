@@ -0,0 +1,67 @@
+from time import time
+
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import resolve, reverse
+from django_knowledgebase.middleware import ReplicaMiddleware
+from django_knowledgebase.routers import ReplicaRouter, get_read_database, read_from
+from kbase.models import Article
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_READ_YOUR_WRITES=5)
+class ReplicaRoutingTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = ReplicaMiddleware(lambda request: HttpResponse())
+
+    def route(self, method, path, cookies=None):
+        # Run the middleware around a request and return the replica selected for the view and the response
+        request = getattr(self.factory, method)(path)
+        request.COOKIES.update(cookies or {})
+        match = resolve(path)
+        self.middleware.process_view(request, match.func, match.args, match.kwargs)
+        selected = get_read_database()
+        response = self.middleware.process_response(request, HttpResponse())
+        self.assertIsNone(get_read_database())
+        return selected, response
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Article), 'default')
+        with read_from('replica1'):
+            self.assertEqual(router.db_for_read(Article), 'replica1')
+            # Reads after a write go to the primary
+            self.assertEqual(router.db_for_write(Article), 'default')
+            self.assertEqual(router.db_for_read(Article), 'default')
+        self.assertIsNone(get_read_database())
+        self.assertTrue(router.allow_migrate('default', 'kbase'))
+        self.assertFalse(router.allow_migrate('replica1', 'kbase'))
+
+    def test_read_only_views_use_replica(self):
+        for path in (reverse('dashboard'), reverse('article', kwargs={'slug': 'test'}),
+                     reverse('article-autocomplete'), reverse('all-users'), reverse('all-groups')):
+            self.assertEqual(self.route('get', path)[0], 'replica1', path)
+
+    def test_other_views_use_primary(self):
+        self.assertIsNone(self.route('get', reverse('edit-article', kwargs={'slug': 'test'}))[0])
+        self.assertIsNone(self.route('post', reverse('dashboard'))[0])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        selected, response = self.route('post', reverse('new-article'))
+        self.assertIsNone(selected)
+        self.assertNotIn(ReplicaMiddleware.cookie_name, response.cookies)
+
+    def test_read_your_writes(self):
+        # A write sends the client to the primary for the read your writes window
+        _, response = self.route('post', reverse('new-article'))
+        cookie = response.cookies[ReplicaMiddleware.cookie_name]
+        self.assertEqual(cookie['max-age'], 5)
+        cookies = {ReplicaMiddleware.cookie_name: cookie.value}
+        self.assertIsNone(self.route('get', reverse('dashboard'), cookies)[0])
+
+        # Once the window has passed the replica is used again
+        expired = {ReplicaMiddleware.cookie_name: str(time() - 1)}
+        self.assertEqual(self.route('get', reverse('dashboard'), expired)[0], 'replica1')
+        invalid = {ReplicaMiddleware.cookie_name: 'invalid'}
+        self.assertEqual(self.route('get', reverse('dashboard'), invalid)[0], 'replica1')
@@ -16,6 +16,10 @@ class UrlsTestCase(TestCase):
         response = self.client.get(reverse('new-article'))
         self.assertRedirects(response, f'{reverse('sign-in')}?next={reverse('new-article')}')
 
+    def test_article_autocomplete_url(self):
+        response = self.client.get(reverse('article-autocomplete'))
+        self.assertRedirects(response, f'{reverse('sign-in')}?next={reverse('article-autocomplete')}')
+
     def test_article_url(self):
         response = self.client.get(reverse('article', kwargs={'slug': 'test'}))
         self.assertRedirects(response, f'{reverse('sign-in')}?next={reverse('article', kwargs={'slug': 'test'})}')
@@ -28,6 +32,15 @@ class UrlsTestCase(TestCase):
         response = self.client.get(reverse('delete-article', kwargs={'slug': 'test'}))
         self.assertRedirects(response, f'{reverse('sign-in')}?next={reverse('delete-article', kwargs={'slug': 'test'})}')
 
+    def test_article_history_url(self):
+        response = self.client.get(reverse('article-history', kwargs={'slug': 'test'}))
+        self.assertRedirects(response, f'{reverse('sign-in')}?next={reverse('article-history', kwargs={'slug': 'test'})}')
+
+    def test_article_revision_url(self):
+        url = reverse('article-revision', kwargs={'slug': 'test', 'number': 1})
+        response = self.client.get(url)
+        self.assertRedirects(response, f'{reverse('sign-in')}?next={url}')
+
 
 class UnverifiedUserUrlsTestCase(TestCase):
     # All these tests should redirect unverified user to the re-verify page
@@ -1,13 +1,41 @@
-from django.test import TestCase
-from django.urls import reverse
+import json
+
+from django.db import connection
+from django.http import Http404
+from django.test import AsyncRequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
 from authentication.models import User, Group
 from kbase.models import Article
+from kbase.views import (DashboardView, ArticleView, ArticleAutocompleteView, AsyncDashboardView, AsyncArticleView,
+                         AsyncArticleAutocompleteView)
 from django.utils.text import slugify
 from django.utils.crypto import get_random_string
+from django.utils import timezone
+from datetime import timedelta
 
 # Generate a random user password for test accounts
 TEST_USER_PASSWORD = get_random_string(length=24)
 
+
+class ConstantQueriesMixin:
+    """
+    Test case mixin for asserting a view runs the same number of queries regardless of data size.
+    """
+    def assertConstantQueries(self, request, add_data):
+        """
+        Count the queries run by request(), call add_data() to grow the data and check request() runs the same number.
+        """
+        with CaptureQueriesContext(connection) as before:
+            request()
+        add_data()
+        with CaptureQueriesContext(connection) as after:
+            request()
+        self.assertEqual(
+            len(before), len(after),
+            'Query count grew with data size:\n' + '\n'.join(query['sql'] for query in after.captured_queries)
+        )
+
 class BasicViewsTestCase(TestCase):
     # These test authenticated user basic access with valid inputs
     def setUp(self):
@@ -102,6 +130,83 @@ class BasicViewsTestCase(TestCase):
         self.assertFalse(Article.objects.filter(id=test_group.id).exists())
 
 
+    def test_article_history_views(self):
+        # Test the history lists revisions, shows their changes and restores them
+        self.test_article.content = 'Test Content\nMore content'
+        self.test_article.save()
+
+        response = self.client.get(reverse('article-history', kwargs={'slug': self.test_article.slug}))
+        self.assertTemplateUsed(response, 'kbase/history.html')
+        self.assertEqual([revision.number for revision in response.context['revisions']], [2, 1])
+
+        response = self.client.get(reverse('article-revision', kwargs={'slug': self.test_article.slug, 'number': 2}))
+        self.assertTemplateUsed(response, 'kbase/revision.html')
+        self.assertIn(('added', 'More content'), response.context['diff'])
+        self.assertTrue(response.context['can_edit'])
+        response = self.client.get(reverse('article-revision', kwargs={'slug': self.test_article.slug, 'number': 3}))
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.post(reverse('restore-revision', kwargs={'slug': self.test_article.slug, 'number': 1}))
+        self.assertRedirects(response, reverse('article', kwargs={'slug': self.test_article.slug}))
+        self.test_article.refresh_from_db()
+        self.assertEqual(self.test_article.content, 'Test Content')
+        # The restore is recorded as a new revision
+        self.assertEqual(self.test_article.revisions.count(), 3)
+
+    def test_restore_revision_keeps_title_taken_by_slug(self):
+        # Test a restore keeps the current title when another article's slug or a reserved slug matches the old one
+        self.test_article.title = 'Renamed'
+        self.test_article.save()
+        other = Article.objects.create(title='test-article', content='Other content', created_by=self.user1)
+
+        response = self.client.post(reverse('restore-revision', kwargs={'slug': 'renamed', 'number': 1}))
+        self.assertRedirects(response, reverse('article', kwargs={'slug': 'renamed'}))
+        self.test_article.refresh_from_db()
+        self.assertEqual(self.test_article.title, 'Renamed')
+        self.assertEqual(other.slug, 'test-article')
+
+        self.test_article.title = 'Autocomplete'
+        self.test_article.save()
+        self.test_article.title = 'Renamed'
+        self.test_article.save()
+        number = self.test_article.revisions.get(title='Autocomplete').number
+        self.client.post(reverse('restore-revision', kwargs={'slug': 'renamed', 'number': number}))
+        self.test_article.refresh_from_db()
+        self.assertEqual(self.test_article.title, 'Renamed')
+
+
+    def test_edit_article_conflict(self):
+        # Test an edit based on an old version shows the other changes instead of overwriting them
+        url = reverse('edit-article', kwargs={'slug': self.test_article.slug})
+        version = self.client.get(url).context['form']['version'].value()
+        data = {'title': 'Test Article', 'content': 'My content', 'groups_with_view': [], 'groups_with_edit': [],
+                'version': version}
+
+        self.test_article.content = 'Their content'
+        self.test_article.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data=data)
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(any('FOR UPDATE' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(response.context['conflict_diff'], [
+            ('range', '@@ -1 +1 @@'), ('removed', 'My content'), ('added', 'Their content'),
+        ])
+        # The form keeps the user's changes and moves to the current version
+        self.assertEqual(response.context['form']['content'].value(), 'My content')
+        self.assertEqual(response.context['form']['version'].value(), version + 1)
+        self.test_article.refresh_from_db()
+        self.assertEqual(self.test_article.content, 'Their content')
+
+        # Saving again replaces the other changes
+        data['version'] = version + 1
+        response = self.client.post(url, data=data)
+        self.assertRedirects(response, reverse('article', kwargs={'slug': self.test_article.slug}))
+        self.test_article.refresh_from_db()
+        self.assertEqual(self.test_article.content, 'My content')
+        self.assertEqual(self.test_article.modified_by, self.user1)
+
+
 class AdvancedViewsTestCase(TestCase):
     # These test permissions on the kbase views
     def setUp(self):
@@ -321,6 +426,19 @@ class AdvancedViewsTestCase(TestCase):
 
     # Admins should be able to view, edit and delete anything without explicit permission
     # User 3 is an admin and does not exist in any of the test groups
+    def test_article_history_permissions(self):
+        # Test users who can view an article can see its history but only editors can restore it
+        self.client.login(email=self.user2.email, password=TEST_USER_PASSWORD)
+        kwargs = {'slug': self.test_article2.slug, 'number': 1}
+        response = self.client.get(reverse('article-revision', kwargs=kwargs))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['can_edit'])
+        response = self.client.post(reverse('restore-revision', kwargs=kwargs))
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.get(reverse('article-history', kwargs={'slug': self.test_article1.slug}))
+        self.assertEqual(response.status_code, 403)
+
     def test_admin_view_article_without_view_permission(self):
         # Log in user3
         self.client.login(email=self.user3.email, password=TEST_USER_PASSWORD)
@@ -354,3 +472,277 @@ class AdvancedViewsTestCase(TestCase):
         # Verify article does not still exist
         self.assertFalse(Article.objects.filter(id=self.test_article5.id).exists())
 
+
+class SearchViewsTestCase(TestCase):
+    # These test the dashboard full text search
+    def setUp(self):
+        self.user1 = User.objects.create_user(
+            email='testuser1@example.com',
+            first_name='Test',
+            last_name='User',
+            password=TEST_USER_PASSWORD,
+        )
+        self.user1.is_verified = True
+        self.user1.save()
+        self.user2 = User.objects.create_user(
+            email='testuser2@example.com',
+            first_name='Test',
+            last_name='User',
+            password=TEST_USER_PASSWORD,
+        )
+        self.user2.is_verified = True
+        self.user2.save()
+
+        self.client.login(email=self.user1.email, password=TEST_USER_PASSWORD)
+
+        self.content_article = Article.objects.create(
+            title='Server Maintenance',
+            content='Restart the database before <b>deploying</b> new releases.',
+            created_by=self.user1,
+        )
+        self.title_article = Article.objects.create(
+            title='Database Backups',
+            content='Backups run every night.',
+            created_by=self.user1,
+        )
+        self.other_article = Article.objects.create(
+            title='Office Plants',
+            content='Water them weekly.',
+            created_by=self.user1,
+        )
+        # Private article owned by user2 which user1 should never find
+        self.private_article = Article.objects.create(
+            title='Private Database Notes',
+            content='Database passwords are in the vault.',
+            created_by=self.user2,
+        )
+
+    def test_search_ranks_title_matches_first(self):
+        response = self.client.get(reverse('dashboard'), {'search': 'database'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['articles']), [self.title_article, self.content_article])
+        self.assertEqual(response.context['search'], 'database')
+
+    def test_search_matches_word_stems(self):
+        response = self.client.get(reverse('dashboard'), {'search': 'deploy'})
+        self.assertEqual(list(response.context['articles']), [self.content_article])
+
+    def test_search_highlights_and_escapes_snippet(self):
+        response = self.client.get(reverse('dashboard'), {'search': 'deploying'})
+        self.assertContains(response, '&lt;b&gt;<mark>deploying</mark>&lt;/b&gt;')
+
+    def test_search_follows_edits(self):
+        self.other_article.content = 'Water them with the database hose.'
+        self.other_article.save()
+        response = self.client.get(reverse('dashboard'), {'search': 'hose'})
+        self.assertEqual(list(response.context['articles']), [self.other_article])
+
+        self.other_article.delete()
+        response = self.client.get(reverse('dashboard'), {'search': 'hose'})
+        self.assertEqual(list(response.context['articles']), [])
+
+    def test_search_ignores_query_syntax(self):
+        response = self.client.get(reverse('dashboard'), {'search': '"database* ('})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['articles']), 2)
+        response = self.client.get(reverse('dashboard'), {'search': '*'})
+        self.assertEqual(len(response.context['articles']), 0)
+
+    def test_autocomplete(self):
+        response = self.client.get(reverse('article-autocomplete'), {'q': 'datab'})
+        self.assertEqual(response.status_code, 200)
+        # Only the permitted title match should be returned
+        self.assertEqual(response.json(), {'results': [
+            {'title': 'Database Backups', 'url': reverse('article', kwargs={'slug': 'database-backups'})},
+        ]})
+
+    def test_autocomplete_limit(self):
+        Article.objects.create(title='Database Restores', content='Test Content', created_by=self.user1)
+        response = self.client.get(reverse('article-autocomplete'), {'q': 'database', 'limit': 1})
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_autocomplete_short_query(self):
+        response = self.client.get(reverse('article-autocomplete'), {'q': 'd'})
+        self.assertEqual(response.json(), {'results': []})
+
+
+class AsyncViewsTestCase(TestCase):
+    # These test the async versions of the read views which are routed in the asgi server mode
+    def setUp(self):
+        self.user1 = User.objects.create_user(
+            email='testuser1@example.com',
+            first_name='Test',
+            last_name='User',
+            password=TEST_USER_PASSWORD,
+        )
+        self.user1.is_verified = True
+        self.user1.save()
+        self.user2 = User.objects.create_user(
+            email='testuser2@example.com',
+            first_name='Test',
+            last_name='User',
+            password=TEST_USER_PASSWORD,
+        )
+        self.user2.is_verified = True
+        self.user2.save()
+        self.article = Article.objects.create(title='Failover Runbook', content='Promote the replica',
+                                              created_by=self.user1)
+
+    def get_request(self, path, user, data=None):
+        request = AsyncRequestFactory().get(path, data)
+        request.user = user
+        return request
+
+    def test_views_are_async(self):
+        # Only the async versions are async, so the default WSGI mode doesn't run views in an event loop
+        for view in (AsyncDashboardView, AsyncArticleView, AsyncArticleAutocompleteView):
+            self.assertTrue(view.view_is_async, view)
+        for view in (DashboardView, ArticleView, ArticleAutocompleteView):
+            self.assertFalse(view.view_is_async, view)
+        self.assertEqual(resolve(reverse('dashboard')).func.view_class, DashboardView)
+
+    async def test_async_views(self):
+        response = await AsyncDashboardView.as_view()(self.get_request(reverse('dashboard'), self.user1))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context_data['articles']), [self.article])
+
+        request = self.get_request(reverse('dashboard'), self.user1, {'search': 'failover'})
+        response = await AsyncDashboardView.as_view()(request)
+        self.assertEqual(list(response.context_data['articles']), [self.article])
+        self.assertEqual(response.context_data['paginator'].count, 1)
+        request = self.get_request(reverse('dashboard'), self.user1, {'search': 'failover', 'page': 2})
+        with self.assertRaises(Http404):
+            await AsyncDashboardView.as_view()(request)
+
+        request = self.get_request(reverse('article', kwargs={'slug': self.article.slug}), self.user1)
+        response = await AsyncArticleView.as_view()(request, slug=self.article.slug)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context_data['can_edit'])
+
+        request = self.get_request(reverse('article-autocomplete'), self.user1, {'q': 'fail'})
+        response = await AsyncArticleAutocompleteView.as_view()(request)
+        self.assertEqual(json.loads(response.content)['results'][0]['title'], 'Failover Runbook')
+
+    async def test_async_article_view_permissions(self):
+        request = self.get_request(reverse('article', kwargs={'slug': self.article.slug}), self.user2)
+        response = await AsyncArticleView.as_view()(request, slug=self.article.slug)
+        self.assertEqual(response.url, reverse('dashboard'))
+        with self.assertRaises(Http404):
+            await AsyncArticleView.as_view()(self.get_request('/kb/missing/', self.user2), slug='missing')
+
+
+class DashboardPaginationTestCase(TestCase):
+    # These test keyset pagination of the dashboard article list
+    def setUp(self):
+        self.user1 = User.objects.create_user(
+            email='testuser1@example.com',
+            first_name='Test',
+            last_name='User',
+            password=TEST_USER_PASSWORD,
+        )
+        self.user1.is_verified = True
+        self.user1.save()
+        self.client.login(email=self.user1.email, password=TEST_USER_PASSWORD)
+
+        # Create more articles than fit on a page, pairs share a modified date to test tie-breaking by id
+        now = timezone.now()
+        for i in range(30):
+            article = Article.objects.create(title=f'Test Article {i}', content='Test Content', created_by=self.user1)
+            Article.objects.filter(pk=article.pk).update(modified_date=now - timedelta(minutes=i // 2))
+        self.expected = list(Article.objects.order_by('-modified_date', '-id'))
+
+    def test_pages_follow_cursors(self):
+        response = self.client.get(reverse('dashboard'))
+        first_page = list(response.context['articles'])
+        self.assertEqual(first_page, self.expected[:25])
+        self.assertTrue(response.context['is_paginated'])
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+        next_cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(reverse('dashboard'), {'after': next_cursor})
+        self.assertEqual(list(response.context['articles']), self.expected[25:])
+        self.assertFalse(response.context['page_obj'].has_next())
+
+        # Going back should return the first page again
+        previous_cursor = response.context['page_obj'].previous_cursor
+        response = self.client.get(reverse('dashboard'), {'before': previous_cursor})
+        self.assertEqual(list(response.context['articles']), first_page)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_pages_oldest_first(self):
+        expected = self.expected[::-1]
+        response = self.client.get(reverse('dashboard'), {'sort_latest': 'modified_date'})
+        self.assertEqual(list(response.context['articles']), expected[:25])
+
+        next_cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(reverse('dashboard'), {'sort_latest': 'modified_date', 'after': next_cursor})
+        self.assertEqual(list(response.context['articles']), expected[25:])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('dashboard'), {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_sort_uses_default(self):
+        response = self.client.get(reverse('dashboard'), {'sort_latest': 'password'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['articles']), self.expected[:25])
+
+
+class QueryCountTestCase(ConstantQueriesMixin, TestCase):
+    # These test the kbase views don't run extra queries per article, author or group
+    def setUp(self):
+        self.user1 = User.objects.create_user(
+            email='testuser1@example.com',
+            first_name='Test',
+            last_name='User',
+            password=TEST_USER_PASSWORD,
+        )
+        self.user1.is_verified = True
+        self.user1.save()
+        self.client.login(email=self.user1.email, password=TEST_USER_PASSWORD)
+
+        self.group = Group.objects.create(name='Test Group')
+        self.group.users.add(self.user1)
+        self.article = Article.objects.create(title='Test Article', content='Test Content', created_by=self.user1)
+        self.article.groups_with_view.set([self.group])
+        self.author_count = 0
+
+    def add_articles(self, count=5):
+        # Every article has its own author and groups so per-row lookups would show up as extra queries
+        for _ in range(count):
+            self.author_count += 1
+            author = User.objects.create_user(
+                email=f'author{self.author_count}@example.com',
+                first_name='Author',
+                last_name='User',
+                password=TEST_USER_PASSWORD,
+            )
+            group = Group.objects.create(name=f'Author Group {self.author_count}')
+            group.users.add(self.user1)
+            article = Article.objects.create(
+                title=f'Author Article {self.author_count}',
+                content='Test Content',
+                created_by=author,
+                modified_by=author,
+            )
+            article.groups_with_view.set([group, self.group])
+            article.groups_with_edit.set([group])
+
+    def test_dashboard_query_count(self):
+        self.assertConstantQueries(lambda: self.client.get(reverse('dashboard')), self.add_articles)
+
+    def test_search_query_count(self):
+        self.assertConstantQueries(
+            lambda: self.client.get(reverse('dashboard'), {'search': 'article'}), self.add_articles
+        )
+
+    def test_article_query_count(self):
+        def add_groups():
+            for i in range(5):
+                group = Group.objects.create(name=f'Extra Group {i}')
+                self.article.groups_with_view.add(group)
+                self.article.groups_with_edit.add(group)
+
+        self.assertConstantQueries(
+            lambda: self.client.get(reverse('article', kwargs={'slug': self.article.slug})), add_groups
+        )
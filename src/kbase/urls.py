@@ -1,12 +1,27 @@
+from django.conf import settings
 from django.urls import path, reverse_lazy
 from django.views.generic import RedirectView
 
 from . import views
 
+# The async read views only help under an ASGI server, WSGI would run each in its own event loop
+if settings.SERVER_MODE == 'asgi':
+    dashboard_view, autocomplete_view, article_view = (
+        views.AsyncDashboardView, views.AsyncArticleAutocompleteView, views.AsyncArticleView
+    )
+else:
+    dashboard_view, autocomplete_view, article_view = (
+        views.DashboardView, views.ArticleAutocompleteView, views.ArticleView
+    )
+
 urlpatterns = [
-    path('', views.DashboardView.as_view(), name='dashboard'),
+    path('', dashboard_view.as_view(), name='dashboard'),
     path('new/', views.NewArticleView.as_view(), name='new-article'),
-    path('<slug:slug>/', views.ArticleView.as_view(), name='article'),
+    path('autocomplete/', autocomplete_view.as_view(), name='article-autocomplete'),
+    path('<slug:slug>/', article_view.as_view(), name='article'),
     path('<slug:slug>/edit/', views.EditArticleView.as_view(), name='edit-article'),
     path('<slug:slug>/delete/', views.DeleteArticleView.as_view(), name='delete-article'),
+    path('<slug:slug>/history/', views.ArticleHistoryView.as_view(), name='article-history'),
+    path('<slug:slug>/history/<int:number>/', views.ArticleRevisionView.as_view(), name='article-revision'),
+    path('<slug:slug>/history/<int:number>/restore/', views.RestoreRevisionView.as_view(), name='restore-revision'),
 ]
\ No newline at end of file
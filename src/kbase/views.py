@@ -1,43 +1,128 @@
-from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.core.paginator import Paginator, InvalidPage
 from django.db.models import Q
-from django.shortcuts import redirect
-from django.urls import reverse_lazy
-from django.views.generic import CreateView, DetailView, UpdateView, ListView, DeleteView
+from django.http import Http404, JsonResponse
+from django.shortcuts import redirect, get_object_or_404
+from django.urls import reverse_lazy, reverse
+from django.utils.text import slugify
+from django.views.generic import CreateView, DetailView, UpdateView, DeleteView, TemplateView, View
+from django.views.generic.detail import SingleObjectMixin
 from .forms import ArticleForm
+from .mixins import ArticlePermissionMixin, AsyncArticlePermissionMixin
 from .models import Article
+from .pagination import KeysetPaginator, apaginate
+from .revisions import get_revision_content, diff_lines
+from .search import search_articles, autocomplete_titles
 from django.contrib import messages
 
 
-class DashboardView(ListView):
+class DashboardView(TemplateView):
+    """
+    Lists the articles the user can view, newest first, or the results of a search.
+    """
+    # Read only, served from a database replica by ReplicaMiddleware
+    use_replica = True
     template_name = 'kbase/dashboard.html'
-    model = Article
-    context_object_name = 'articles'
+    paginate_by = 25
+    sort_options = ('-modified_date', 'modified_date')
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Article.objects.filter(
-            id__in=[
-                article.id for article in Article.objects.all()
-                if article.get_permissions(user) in ('view', 'edit')
-            ]
-        )
-        search_query = self.request.GET.get('search')
+        # Fetch authors with the articles and skip the article body which the list doesn't show
+        return Article.objects.visible_to(self.request.user).select_related(
+            'modified_by', 'created_by'
+        ).defer('content', 'search_vector')
+
+    def get_sort(self):
+        sort = self.request.GET.get('sort_latest')
+        return sort if sort in self.sort_options else self.sort_options[0]
+
+    def get_keyset_paginator(self, queryset):
+        # The article list seeks by modified date so deep pages cost the same as the first
+        return KeysetPaginator(queryset.order_by(self.get_sort()), self.paginate_by,
+                               descending=self.get_sort().startswith('-'))
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        search_query = request.GET.get('search')
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(content__icontains=search_query)
-            )
-            return queryset
+            # Search results are ordered by rank so use page numbers
+            paginator = Paginator(search_articles(queryset, search_query), self.paginate_by)
+            number = request.GET.get('page') or 1
+            try:
+                page = paginator.page(paginator.num_pages if number == 'last' else number)
+            except InvalidPage as e:
+                raise Http404(f'Invalid page ({number}): {e}')
         else:
-            sort = self.request.GET.get('sort_latest', '-modified_date')
-            return queryset.order_by(sort)
+            paginator = self.get_keyset_paginator(queryset)
+            page = paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
+        return self.render_page(paginator, page)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    def render_page(self, paginator, page):
+        context = self.get_context_data(
+            articles=page.object_list,
+            paginator=paginator,
+            page_obj=page,
+            is_paginated=page.has_other_pages(),
+        )
         search_query = self.request.GET.get('search')
         if search_query:
             context['search'] = search_query
-        return context
+        if 'sort_latest' in self.request.GET:
+            context['sort'] = self.get_sort()
+        return self.render_to_response(context)
+
+
+class AsyncDashboardView(DashboardView):
+    """
+    DashboardView using the async ORM, so waiting on the database doesn't hold a worker under an ASGI server.
+    Only routed in the asgi server mode, under WSGI every async view runs in its own event loop.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        search_query = request.GET.get('search')
+        if search_query:
+            page = await apaginate(search_articles(queryset, search_query), self.paginate_by,
+                                   request.GET.get('page') or 1)
+            paginator = page.paginator
+        else:
+            paginator = self.get_keyset_paginator(queryset)
+            page = await paginator.aget_page(after=request.GET.get('after'), before=request.GET.get('before'))
+        return self.render_page(paginator, page)
+
+
+class ArticleAutocompleteView(View):
+    """
+    Returns the titles best matching partially typed text as JSON, for search-as-you-type.
+    """
+    use_replica = True
+    default_limit = 10
+    max_limit = 25
+
+    def get_titles(self):
+        try:
+            limit = min(max(int(self.request.GET.get('limit', self.default_limit)), 1), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+        articles = autocomplete_titles(Article.objects.visible_to(self.request.user),
+                                       self.request.GET.get('q', ''), limit)
+        return articles.values_list('title', 'slug')
+
+    def render_titles(self, titles):
+        results = [{'title': title, 'url': reverse('article', kwargs={'slug': slug})} for title, slug in titles]
+        return JsonResponse({'results': results})
+
+    def get(self, request, *args, **kwargs):
+        return self.render_titles(self.get_titles())
+
+
+class AsyncArticleAutocompleteView(ArticleAutocompleteView):
+    """
+    ArticleAutocompleteView using the async ORM, only routed in the asgi server mode.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        return self.render_titles([titles async for titles in self.get_titles()])
 
 
 class NewArticleView(CreateView):
@@ -56,7 +141,8 @@ class NewArticleView(CreateView):
         return super().form_valid(form)
 
 
-class ArticleView(DetailView):
+class ArticleView(ArticlePermissionMixin, DetailView):
+    use_replica = True
     template_name = 'kbase/article.html'
     model = Article
     context_object_name = 'article'
@@ -66,9 +152,7 @@ class ArticleView(DetailView):
 
         # Set can_edit to true if user has edit permission.
         article = self.object
-        user = self.request.user
-        user.permission = article.get_permissions(user)
-        context['can_edit'] = user.permission == 'edit'
+        context['can_edit'] = self.permission == 'edit'
 
         # Append edit groups to view groups.
         # This is just for user appearance as editors have view permission by default.
@@ -86,47 +170,139 @@ class ArticleView(DetailView):
 
         return context
 
-    def dispatch(self, request, *args, **kwargs):
-        article = self.get_object()
-        if not article.get_permissions(self.request.user) in ('view', 'edit'):
-            return redirect(reverse_lazy(viewname='dashboard'))
-        return super().dispatch(request, *args, **kwargs)
+    def handle_no_permission(self):
+        return redirect(reverse_lazy(viewname='dashboard'))
+
+
+class AsyncArticleView(AsyncArticlePermissionMixin, ArticleView):
+    """
+    ArticleView fetching the article and permission with the async ORM, only routed in the asgi server mode.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        # The article and its groups were fetched by the permission check, rendering needs no more queries
+        self.object = self.get_object()
+        return self.render_to_response(self.get_context_data(object=self.object))
 
 
-class EditArticleView(UpdateView):
+class EditArticleView(ArticlePermissionMixin, UpdateView):
     model = Article
     form_class = ArticleForm
     template_name = 'kbase/new-edit.html'
+    required_permissions = ('edit',)
+    permission_denied_message = 'You do not have permission to edit this article.'
 
     def get_success_url(self):
         slug = self.object.slug
         messages.success(self.request, 'Article updated successfully.')
         return reverse_lazy(viewname='article', kwargs={'slug': slug})
 
-    def dispatch(self, request, *args, **kwargs):
-        article = self.get_object()
-        if not article.get_permissions(self.request.user) == 'edit':
-            messages.error(self.request, 'You do not have permission to edit this article.')
-            raise PermissionDenied()
-        return super().dispatch(request, *args, **kwargs)
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['edit_mode'] = True
         return context
 
-class DeleteArticleView(DeleteView):
+    def form_valid(self, form):
+        article = form.save(commit=False)
+        article.modified_by = self.request.user
+        # Forms without a version are checked against the version loaded for this request
+        version = form.cleaned_data.get('version') or self.object.version
+        with transaction.atomic():
+            if not article.save_if_unchanged(version):
+                return self.form_conflict(form)
+            form.save_m2m()
+        return redirect(self.get_success_url())
+
+    def form_conflict(self, form):
+        """
+        Show the form again with the changes saved by someone else since it was opened.
+        The form keeps the user's changes and is moved to the current version, so saving again overwrites them.
+        """
+        current = Article.objects.select_related('modified_by').get(pk=self.object.pk)
+        data = form.data.copy()
+        data['version'] = current.version
+        form = self.get_form_class()(data=data, instance=current)
+        messages.error(self.request, f'{current.modified_by.full_name if current.modified_by else "Someone"} saved '
+                                     f'this article while you were editing it. Review their changes below and save '
+                                     f'again to replace them with yours.')
+        context = self.get_context_data(form=form)
+        context['article'] = self.object = current
+        context['conflict_diff'] = diff_lines(data.get('content', ''), current.content)
+        return self.render_to_response(context, status=409)
+
+class DeleteArticleView(ArticlePermissionMixin, DeleteView):
     model = Article
     context_object_name = 'article'
     success_url = reverse_lazy('dashboard')
-
-    def dispatch(self, request, *args, **kwargs):
-        article = self.get_object()
-        if not article.get_permissions(self.request.user) == 'edit':
-            messages.error(self.request, 'You do not have permission to delete this article.')
-            raise PermissionDenied()
-        return super().dispatch(request, *args, **kwargs)
+    required_permissions = ('edit',)
+    permission_denied_message = 'You do not have permission to delete this article.'
 
     def get_success_url(self):
         messages.success(self.request, 'Article deleted successfully.')
         return super().get_success_url()
+
+
+class ArticleHistoryView(ArticlePermissionMixin, DetailView):
+    use_replica = True
+    template_name = 'kbase/history.html'
+    model = Article
+    context_object_name = 'article'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # The compressed content is not needed to list revisions
+        context['revisions'] = self.object.revisions.select_related('created_by').defer('data').order_by('-number')
+        return context
+
+
+class ArticleRevisionView(ArticlePermissionMixin, DetailView):
+    """
+    Shows the changes a revision made compared to the revision before it.
+    """
+    use_replica = True
+    template_name = 'kbase/revision.html'
+    model = Article
+    context_object_name = 'article'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        revisions = self.object.revisions.select_related('created_by').order_by('-number')
+        revision = get_object_or_404(revisions, number=self.kwargs['number'])
+        previous = revisions.filter(number__lt=revision.number).first()
+
+        content = get_revision_content(revision)
+        previous_content = get_revision_content(previous) if previous else ''
+        context['revision'] = revision
+        context['previous'] = previous
+        context['diff'] = diff_lines(previous_content, content)
+        context['can_edit'] = self.permission == 'edit'
+        return context
+
+
+class RestoreRevisionView(ArticlePermissionMixin, SingleObjectMixin, View):
+    """
+    Saves the title and content of an earlier revision as the article's current version.
+    The restore is recorded as a new revision so it can be undone.
+    """
+    model = Article
+    http_method_names = ['post']
+    required_permissions = ('edit',)
+    permission_denied_message = 'You do not have permission to edit this article.'
+
+    def post(self, request, *args, **kwargs):
+        article = self.get_object()
+        revision = get_object_or_404(article.revisions, number=self.kwargs['number'])
+
+        article.content = get_revision_content(revision)
+        article.modified_by = request.user
+        # Keep the current title if it is now reserved or another article has taken the old title or its slug since
+        slug = slugify(revision.title)
+        taken = Article.objects.filter(Q(title__iexact=revision.title) | Q(slug=slug)).exclude(pk=article.pk)
+        if slug in ArticleForm.reserved_slugs or taken.exists():
+            messages.warning(request, f'The title {revision.title} is used by another article so it was not restored.')
+        else:
+            article.title = revision.title
+        article.save()
+
+        messages.success(request, f'Article restored to revision {revision.number}.')
+        return redirect(reverse('article', kwargs={'slug': article.slug}))